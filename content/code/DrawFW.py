@@ -8,51 +8,55 @@
 	
 """
 import networkx as nx
-import scipy as sc
+import numpy as np
+import sys
 import matplotlib.pyplot as plt
+from foodweb_models import rdm_adj_list
 # import matplotlib.animation as ani #for animation
 
-def GenRdmAdjList(N = 2, C = 0.5):
+def GenRdmAdjList(N = 2, C = 0.5, rng = None):
 	""" 
 	Generate random adjacency list given N nodes with connectance 
-	probability C
+	probability C. All N link draws are made in one batch (see 
+	foodweb_models.py for this and other food web models); rng is a 
+	numpy random Generator or seed
 	"""
-	Ids = range(N)
-	ALst = []
-	for i in Ids:
-		if sc.random.uniform(0,1,1) < C:
-			Lnk = sc.random.choice(Ids,2).tolist()
-			if Lnk[0] != Lnk[1]: #avoid self loops
-				ALst.append(Lnk)
-	return ALst
-
-## Assign body mass range
-SizRan = ([-10,10]) #use log scale
-
-## Assign number of species (MaxN) and connectance (C)
-MaxN = 30
-C = 0.75
-
-## Generate adjacency list:
-AdjL = sc.array(GenRdmAdjList(MaxN, C))
-
-## Generate species (node) data:
-Sps = sc.unique(AdjL) # get species ids
-Sizs = sc.random.uniform(SizRan[0],SizRan[1],MaxN)# Generate body sizes (log10 scale)
-
-###### The Plotting #####
-plt.close('all')
-
-##Plot using networkx:
-
-## Calculate coordinates for circular configuration:
-## (See networkx.layout for inbuilt functions to compute other types of node 
-# coords)
-pos = nx.circular_layout(Sps)
-
-G = nx.Graph()
-G.add_nodes_from(Sps)
-G.add_edges_from(tuple(AdjL))
-NodSizs= 10**-32 + (Sizs-min(Sizs))/(max(Sizs)-min(Sizs)) #node sizes in proportion to body sizes
-nx.draw(G, pos, node_size = NodSizs*1000)
-plt.show()
+	return rdm_adj_list(N, C, rng).tolist()
+
+def main(argv):
+	""" Generate a random food web and plot it """
+	## Assign body mass range
+	SizRan = ([-10,10]) #use log scale
+
+	## Assign number of species (MaxN) and connectance (C)
+	MaxN = 30
+	C = 0.75
+
+	## Generate adjacency list:
+	AdjL = np.array(GenRdmAdjList(MaxN, C))
+
+	## Generate species (node) data:
+	Sps = np.unique(AdjL) # get species ids
+	Sizs = np.random.uniform(SizRan[0],SizRan[1],len(Sps))# Generate body sizes (log10 scale), one per species in the web
+
+	###### The Plotting #####
+	plt.close('all')
+
+	##Plot using networkx:
+
+	## Calculate coordinates for circular configuration:
+	## (See networkx.layout for inbuilt functions to compute other types of node 
+	# coords, and foodweb_plot.py for faster layouts and plots of large webs)
+	pos = nx.circular_layout(Sps)
+
+	G = nx.Graph()
+	G.add_nodes_from(Sps)
+	G.add_edges_from(tuple(AdjL))
+	NodSizs= 10**-32 + (Sizs-min(Sizs))/(max(Sizs)-min(Sizs)) #node sizes in proportion to body sizes
+	nx.draw(G, pos, node_size = NodSizs*1000)
+	plt.show()
+	return 0
+
+if __name__ == "__main__":
+	status = main(sys.argv)
+	sys.exit(status)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+"""All-vs-all alignment of the sequences in a directory of FASTA files.
+
+Every pair of sequences is aligned with align_seqs_vect (ungapped, all
+overlaps), or with kmer_index's seeded search if a k-mer length is given,
+with the pairs spread across a pool of worker processes, and the best scores
+are written out as a (symmetric) score matrix in csv format. The diagonal
+holds each sequence's score against itself, i.e. its length.
+
+Usage: python3 align_batch.py [-o scores.csv] [-p 4] [-k 12] ../data/fasta/"""
+
+__appname__ = 'align_batch'
+__version__ = '0.0.1'
+
+import argparse
+import csv
+import functools
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from align_seqs_vect import encode, score_profile
+from fasta import read_fasta_dir, record_id
+from kmer_index import seeded_search
+
+## functions ##
+
+_seqs = None # the encoded sequences, set once in each worker process
+
+def _init_worker(seqs):
+    """Give a worker process its own copy of the sequences, once, so that
+    tasks only need to carry pairs of indices"""
+    global _seqs
+    _seqs = seqs
+
+def _score_pairs(pairs, method='auto', overlap='full', kmer=None):
+    """Best scores of a chunk of (i, j) pairs of sequences"""
+    out = []
+    for i, j in pairs:
+        s1, s2 = _seqs[i], _seqs[j]
+        if len(s1) < len(s2):
+            s1, s2 = s2, s1
+        if len(s2) == 0:
+            out.append((i, j, 0))
+        elif kmer:
+            scores = seeded_search(s1, s2, kmer, overlap=overlap)[1]
+            out.append((i, j, int(scores.max())))
+        else:
+            out.append((i, j, int(score_profile(s1, s2, method, overlap).max())))
+    return out
+
+def _chunks(iterable, size):
+    """Split an iterable into lists of (at most) size items"""
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def score_matrix(seqs, processes=None, chunksize=64, method='auto',
+                 overlap='full', kmer=None):
+    """Best alignment score of every pair of sequences (strings or encoded
+    arrays), computed in a pool of `processes` worker processes (all the
+    cores by default; 1 runs everything in this process). If kmer is given,
+    only the offsets proposed by k-mer seeds of that length are scored.
+
+    >>> score_matrix(["ACGTACGT", "CGTA", "TTTT"], processes=1)
+    array([[8, 4, 1],
+           [4, 4, 1],
+           [1, 1, 4]])
+    """
+    seqs = [encode(s) if isinstance(s, str) else s for s in seqs]
+    n = len(seqs)
+    scores = np.zeros((n, n), dtype=np.int64)
+    scores[np.diag_indices(n)] = [len(s) for s in seqs]
+    tasks = _chunks(itertools.combinations(range(n), 2), chunksize)
+    if processes == 1:
+        _init_worker(seqs)
+        results = (_score_pairs(task, method, overlap, kmer) for task in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, _init_worker, (seqs,))
+        results = pool.imap_unordered(
+            functools.partial(_score_pairs, method=method, overlap=overlap,
+                              kmer=kmer),
+            tasks)
+    try:
+        for chunk in results:
+            for i, j, score in chunk:
+                scores[i, j] = scores[j, i] = score
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return scores
+
+def write_matrix(filename, ids, scores):
+    """Write a labelled score matrix to a csv file"""
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([''] + ids)
+        for name, row in zip(ids, scores):
+            writer.writerow([name] + row.tolist())
+
+def main(argv):
+    """ Main entry point of the program """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('directory', help='directory of FASTA files')
+    parser.add_argument('-o', '--output', default='../results/align_scores.csv',
+                        help='score matrix csv file (default: %(default)s)')
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help='number of worker processes (default: all cores)')
+    parser.add_argument('--overlap', choices=['full', 'right'], default='full',
+                        help="which overlaps to search (default: full)")
+    parser.add_argument('-k', '--kmer', type=int, default=None,
+                        help='only score offsets seeded by shared k-mers of this length')
+    args = parser.parse_args(argv[1:])
+
+    ids = []
+    seqs = []
+    for header, seq in read_fasta_dir(args.directory):
+        ids.append(record_id(header))
+        seqs.append(encode(seq))
+    if not seqs:
+        print("No FASTA records found in %s" % args.directory)
+        return 1
+
+    start = time.time()
+    scores = score_matrix(seqs, args.processes, overlap=args.overlap,
+                          kmer=args.kmer)
+    print("Aligned %d pairs of %d sequences in %.2f s" %
+          (len(seqs) * (len(seqs) - 1) // 2, len(seqs), time.time() - start))
+    write_matrix(args.output, ids, scores)
+    print("Score matrix written to %s" % os.path.normpath(args.output))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
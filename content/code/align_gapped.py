@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+"""Gapped alignment of two sequences by dynamic programming.
+
+Needleman-Wunsch (global) and Smith-Waterman (local) alignment with a linear
+gap penalty. Cells on the same anti-diagonal of the dynamic programming
+matrix don't depend on each other, so each anti-diagonal is computed in one
+go with numpy, keeping only the last two in memory. The alignment itself is
+recovered with Hirschberg's divide and conquer algorithm, which needs memory
+proportional to the sequence lengths rather than their product, so aligning
+two 10 kb sequences doesn't need a matrix of 100 million cells.
+
+Usage: python3 align_gapped.py [--local] [seq1.fasta seq2.fasta]"""
+
+__appname__ = 'align_gapped'
+__version__ = '0.0.1'
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from align_seqs_vect import encode, search
+from fasta import read_fasta
+
+## constants ##
+
+MATCH = 1
+MISMATCH = -1
+GAP = -2
+FULL_CELLS = 2 ** 16 # below this many cells, keep the whole matrix
+GAP_CODE = ord('-')
+
+## functions ##
+
+def _sweep(a, b, match=MATCH, mismatch=MISMATCH, gap=GAP, local=False,
+           find_best=False, keep=False):
+    """Fill the dynamic programming matrix of a (rows) vs b (columns) one
+    anti-diagonal at a time. Returns the last row of the matrix, the best
+    cell score and its (i, j) position (if local or find_best, else 0 and
+    (0, 0)), and the list of all anti-diagonals if keep is True (else None).
+    Anti-diagonal d holds the cells (i, d - i), indexed by i."""
+    n, m = len(a), len(b)
+    b_rev = b[::-1]
+    prev2 = np.zeros(n + 1, dtype=np.int64) # anti-diagonal d - 2
+    prev1 = np.zeros(n + 1, dtype=np.int64) # anti-diagonal d - 1
+    last_row = np.empty(m + 1, dtype=np.int64)
+    best, best_cell = 0, (0, 0)
+    diagonals = [] if keep else None
+    for d in range(n + m + 1):
+        cur = np.empty(n + 1, dtype=np.int64)
+        lo, hi = max(0, d - m), min(n, d)
+        ilo, ihi = max(1, d - m), min(n, d - 1) # the interior cells
+        if ilo <= ihi:
+            same = a[ilo - 1:ihi] == b_rev[m - d + ilo:m - d + ihi + 1]
+            cell = prev2[ilo - 1:ihi] + np.where(same, match, mismatch)
+            np.maximum(cell, prev1[ilo - 1:ihi] + gap, out=cell) # from above
+            np.maximum(cell, prev1[ilo:ihi + 1] + gap, out=cell) # from the left
+            if local:
+                np.maximum(cell, 0, out=cell)
+            cur[ilo:ihi + 1] = cell
+        if d <= m: # first row
+            cur[0] = 0 if local else d * gap
+        if d <= n: # first column
+            cur[d] = 0 if local else d * gap
+        if local or find_best:
+            k = int(np.argmax(cur[lo:hi + 1]))
+            if cur[lo + k] > best:
+                best, best_cell = int(cur[lo + k]), (lo + k, d - lo - k)
+        if d >= n:
+            last_row[d - n] = cur[n]
+        if keep:
+            diagonals.append(cur[lo:hi + 1].copy())
+        prev2, prev1 = prev1, cur
+    return last_row, best, best_cell, diagonals
+
+def _traceback(a, b, match=MATCH, mismatch=MISMATCH, gap=GAP):
+    """Globally align two short sequences with the whole matrix in memory.
+    Returns the two aligned sequences as uint8 arrays with '-' for gaps."""
+    n, m = len(a), len(b)
+    diagonals = _sweep(a, b, match, mismatch, gap, keep=True)[3]
+    def H(i, j):
+        return diagonals[i + j][i - max(0, i + j - m)]
+    out1, out2 = [], []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and H(i, j) == H(i - 1, j - 1) + (
+                match if a[i - 1] == b[j - 1] else mismatch):
+            i, j = i - 1, j - 1
+            out1.append(a[i]); out2.append(b[j])
+        elif i > 0 and H(i, j) == H(i - 1, j) + gap:
+            i -= 1
+            out1.append(a[i]); out2.append(GAP_CODE)
+        else:
+            j -= 1
+            out1.append(GAP_CODE); out2.append(b[j])
+    return (np.array(out1[::-1], dtype=np.uint8),
+            np.array(out2[::-1], dtype=np.uint8))
+
+def _hirschberg(a, b, match=MATCH, mismatch=MISMATCH, gap=GAP):
+    """Globally align two sequences in linear memory: split a in half, find
+    where the optimal alignment crosses that row from the last rows of a
+    forward and a backward pass, and align the two halves separately"""
+    n, m = len(a), len(b)
+    if n <= 1 or m == 0 or n * m <= FULL_CELLS:
+        return _traceback(a, b, match, mismatch, gap)
+    mid = n // 2
+    forward = _sweep(a[:mid], b, match, mismatch, gap)[0]
+    backward = _sweep(a[mid:][::-1], b[::-1], match, mismatch, gap)[0][::-1]
+    k = int(np.argmax(forward + backward))
+    top1, top2 = _hirschberg(a[:mid], b[:k], match, mismatch, gap)
+    bottom1, bottom2 = _hirschberg(a[mid:], b[k:], match, mismatch, gap)
+    return np.concatenate((top1, bottom1)), np.concatenate((top2, bottom2))
+
+def _decode(aligned):
+    """Turn an encoded (aligned) sequence back into a string"""
+    return aligned.tobytes().decode('ascii')
+
+def alignment_score(aligned1, aligned2, match=MATCH, mismatch=MISMATCH, gap=GAP):
+    """Score of an alignment given as two equal-length strings with '-' gaps
+
+    >>> alignment_score("GATT-ACA", "GA-TTACA")
+    2
+    """
+    a, b = encode(aligned1), encode(aligned2)
+    gaps = (a == GAP_CODE) | (b == GAP_CODE)
+    matches = int(((a == b) & ~gaps).sum())
+    return matches * match + int((~gaps).sum() - matches) * mismatch + int(gaps.sum()) * gap
+
+def nw_score(seq1, seq2, match=MATCH, mismatch=MISMATCH, gap=GAP):
+    """Needleman-Wunsch (global alignment) score, in linear memory
+
+    >>> nw_score("GATTACA", "GCATGCU")
+    -1
+    """
+    return int(_sweep(encode(seq1), encode(seq2), match, mismatch, gap)[0][-1])
+
+def sw_score(seq1, seq2, match=MATCH, mismatch=MISMATCH, gap=GAP):
+    """Smith-Waterman (local alignment) score, in linear memory
+
+    >>> sw_score("TTTTGATTACATTTT", "CCGATTACACC")
+    7
+    """
+    return _sweep(encode(seq1), encode(seq2), match, mismatch, gap, local=True)[1]
+
+def nw_align(seq1, seq2, match=MATCH, mismatch=MISMATCH, gap=GAP):
+    """Optimal global alignment (Needleman-Wunsch, Hirschberg traceback).
+    Returns the score and the two aligned sequences, with '-' for gaps.
+
+    >>> nw_align("GATTACA", "GATACA")
+    (4, 'GATTACA', 'GA-TACA')
+    """
+    a1, a2 = _hirschberg(encode(seq1), encode(seq2), match, mismatch, gap)
+    aligned1, aligned2 = _decode(a1), _decode(a2)
+    return (alignment_score(aligned1, aligned2, match, mismatch, gap),
+            aligned1, aligned2)
+
+def sw_align(seq1, seq2, match=MATCH, mismatch=MISMATCH, gap=GAP):
+    """Optimal local alignment (Smith-Waterman, Hirschberg traceback).
+    Returns the score, the two aligned subsequences, and where they start in
+    seq1 and seq2. The end of the alignment is the best cell of a forward
+    pass, its start the best cell of a pass over the reversed prefixes, and
+    the subsequences in between are aligned globally.
+
+    >>> sw_align("TTTTGATTACATTTT", "CCGATTACACC")
+    (7, 'GATTACA', 'GATTACA', 4, 2)
+    """
+    a, b = encode(seq1), encode(seq2)
+    score, (i_end, j_end) = _sweep(a, b, match, mismatch, gap, local=True)[1:3]
+    if score == 0:
+        return 0, '', '', 0, 0
+    _, _, (i_len, j_len), _ = _sweep(a[:i_end][::-1], b[:j_end][::-1],
+                                     match, mismatch, gap, find_best=True)
+    i_start, j_start = i_end - i_len, j_end - j_len
+    a1, a2 = _hirschberg(a[i_start:i_end], b[j_start:j_end], match, mismatch, gap)
+    return score, _decode(a1), _decode(a2), i_start, j_start
+
+def main(argv):
+    """ Main entry point of the program """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('fasta', nargs='*', help='two FASTA files to align')
+    parser.add_argument('--local', action='store_true',
+                        help='local (Smith-Waterman) instead of global alignment')
+    args = parser.parse_args(argv[1:])
+    if len(args.fasta) == 2:
+        seq1 = next(read_fasta(args.fasta[0]))[1] # the first record of each file
+        seq2 = next(read_fasta(args.fasta[1]))[1]
+    else:
+        seq1 = "ATCGCCGGATTACGGG"
+        seq2 = "CAATTCGGAT"
+
+    start = time.time()
+    if args.local:
+        score, aligned1, aligned2 = sw_align(seq1, seq2)[:3]
+    else:
+        score, aligned1, aligned2 = nw_align(seq1, seq2)
+    gapped_time = time.time() - start
+    if len(aligned1) <= 100:
+        print(aligned1)
+        print(''.join('*' if x == y else ' ' for x, y in zip(aligned1, aligned2)))
+        print(aligned2)
+    print("Gapped %s alignment score: %d (%d columns, %.3f s)" %
+          ('local' if args.local else 'global', score, len(aligned1), gapped_time))
+
+    start = time.time()
+    best = search(seq1, seq2)[1].max()
+    print("Best ungapped matches: %d (%.3f s)" % (best, time.time() - start))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+"""A vectorized version of align_seqs.py.
+
+Sequences are encoded as uint8 numpy arrays, and the number of matching bases
+is computed for all offsets of one sequence along the other at once (letting
+the shorter sequence overhang either end of the longer one), either with a
+sliding window comparison (short sequences) or with an FFT-based
+cross-correlation (long sequences), instead of one base at a time in a Python
+loop. Nothing is printed unless asked for, so the scores of kilobase-long
+sequences (like the ones in ../data/fasta/) can be computed in milliseconds.
+
+Usage: python3 align_seqs_vect.py [seq1.fasta seq2.fasta]"""
+
+__appname__ = 'align_seqs_vect'
+__version__ = '0.0.1'
+
+import sys
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from fasta import read_fasta
+from packed_seq import PackedSeq, score_profile_packed
+
+## constants ##
+
+FFT_MIN_CELLS = 2 ** 18 # use the FFT when l1 * l2 is larger than this
+CHUNK_CELLS = 2 ** 22 # max cells compared at once by the sliding window
+
+## functions ##
+
+def encode(seq):
+    """Encode a sequence string as a uint8 array of (uppercase) ASCII codes
+
+    >>> encode("acgT")
+    array([65, 67, 71, 84], dtype=uint8)
+    """
+    return np.frombuffer(seq.upper().encode('ascii'), dtype=np.uint8)
+
+def _as_array(seq):
+    """Encode seq if it is a string, leave it alone if it's already an array"""
+    if isinstance(seq, str):
+        return encode(seq)
+    return np.asarray(seq, dtype=np.uint8)
+
+def profile_offsets(l1, l2, overlap='right'):
+    """The offsets (startpoints of s2 along s1) that a score profile covers:
+    0..l1-1 when overlap is 'right' (s2 only hangs off the right end of s1,
+    as in align_seqs.py), -(l2-1)..l1-1 when it is 'full' (every overlap)
+
+    >>> profile_offsets(4, 3, 'full')
+    array([-2, -1,  0,  1,  2,  3])
+    """
+    if overlap == 'right':
+        return np.arange(l1)
+    if overlap == 'full':
+        return np.arange(-(l2 - 1), l1)
+    raise ValueError("unknown overlap %r" % overlap)
+
+def score_profile_direct(s1, s2, overlap='right'):
+    """Number of matches for every offset of s2 along s1, by comparing s2 with
+    all the (overlapping) windows of s1, a chunk of windows at a time"""
+    l1, l2 = len(s1), len(s2)
+    left = l2 - 1 if overlap == 'full' else 0
+    # pad with zeros, which never match a base, so that s2 can hang off the ends
+    padded = np.concatenate((np.zeros(left, dtype=np.uint8), s1,
+                             np.zeros(l2, dtype=np.uint8)))
+    windows = sliding_window_view(padded, l2)[:left + l1] # a view, no copying
+    scores = np.empty(left + l1, dtype=np.int64)
+    step = max(1, CHUNK_CELLS // max(l2, 1))
+    for i in range(0, left + l1, step):
+        scores[i:i + step] = (windows[i:i + step] == s2).sum(axis=1)
+    return scores
+
+def score_profile_fft(s1, s2, overlap='right'):
+    """Number of matches for every offset of s2 along s1, as the sum over
+    symbols of the cross-correlations of their indicator vectors (via FFT)"""
+    l1, l2 = len(s1), len(s2)
+    n = 1 << int(l1 + l2 - 1).bit_length() # no wrap-around for n >= l1 + l2 - 1
+    spectrum = np.zeros(n // 2 + 1, dtype=np.complex128)
+    for symbol in np.intersect1d(s1, s2): # symbols in only one can't match
+        a = np.fft.rfft(s1 == symbol, n)
+        b = np.fft.rfft(s2 == symbol, n)
+        spectrum += a * np.conj(b)
+    corr = np.rint(np.fft.irfft(spectrum, n)).astype(np.int64)
+    if overlap == 'full': # negative offsets wrap around to the end
+        return np.concatenate((corr[n - (l2 - 1):], corr[:l1]))
+    return corr[:l1]
+
+def score_profile(s1, s2, method='auto', overlap='right'):
+    """Number of matching bases at each offset of s2 along s1 (see
+    profile_offsets). With overlap='right' these are the scores that
+    calculate_score in align_seqs.py returns, but all of them at once.
+    method is 'direct', 'fft', 'packed' or 'auto' (pick by problem size).
+    The 'packed' method (used whenever s1 or s2 is a PackedSeq, and never
+    chosen by 'auto' otherwise) works on 2-bit encoded DNA, where ambiguous
+    bases such as N never match. Note that this differs from 'direct' and
+    'fft', which compare letters, so that N matches N there.
+
+    >>> score_profile("CAATTCGGAT", "ATCG")
+    array([0, 1, 2, 3, 1, 0, 0, 0, 2, 0])
+    >>> score_profile("CAATTCGGAT", "ATCG", method='fft')
+    array([0, 1, 2, 3, 1, 0, 0, 0, 2, 0])
+    >>> score_profile("CAATTCGGAT", "ATCG", method='packed')
+    array([0, 1, 2, 3, 1, 0, 0, 0, 2, 0])
+    >>> score_profile("CAATTCGGAT", "ATCG", overlap='full')
+    array([0, 1, 0, 0, 1, 2, 3, 1, 0, 0, 0, 2, 0])
+    >>> score_profile("ACGTN", "ACGTN"), score_profile("ACGTN", "ACGTN", method='packed')
+    (array([5, 0, 0, 0, 0]), array([4, 0, 0, 0, 0]))
+    """
+    if overlap not in ('right', 'full'):
+        raise ValueError("unknown overlap %r" % overlap)
+    if len(s1) == 0 or len(s2) == 0:
+        raise ValueError("cannot score an alignment with an empty sequence")
+    if method == 'packed' or isinstance(s1, PackedSeq) or isinstance(s2, PackedSeq):
+        return score_profile_packed(s1, s2, overlap)
+    s1 = _as_array(s1)
+    s2 = _as_array(s2)
+    if method == 'auto':
+        method = 'fft' if len(s1) * len(s2) > FFT_MIN_CELLS else 'direct'
+    if method == 'direct':
+        return score_profile_direct(s1, s2, overlap)
+    if method == 'fft':
+        return score_profile_fft(s1, s2, overlap)
+    raise ValueError("unknown method %r" % method)
+
+def show_alignment(s1, s2, offset):
+    """Print an alignment in the same format as calculate_score does (with
+    s1 shifted right instead when s2 hangs off its left end)"""
+    matched = ''.join('.' if offset + j < 0 else ('*' if s1[offset + j] == b else '-')
+                      for j, b in enumerate(s2) if offset + j < len(s1))
+    print("." * offset + matched)
+    print("." * offset + s2)
+    print("." * -offset + s1)
+    print(matched.count('*'))
+    print(" ")
+
+def search(seq1, seq2, method='auto', overlap='full'):
+    """Score every alignment of two sequences (strings), sliding the shorter
+    along the longer. Returns the offsets of the shorter sequence along the
+    longer, the score at each offset, and all the offsets with the best score.
+
+    >>> offsets, scores, best = search("ATCGCCGGATTACGGG", "CAATTCGGAT")
+    >>> best.tolist(), int(scores.max())
+    ([0, 7], 5)
+    """
+    if len(seq1) >= len(seq2):
+        s1, s2 = seq1, seq2
+    else:
+        s1, s2 = seq2, seq1
+    scores = score_profile(s1, s2, method, overlap)
+    offsets = profile_offsets(len(s1), len(s2), overlap)
+    best = offsets[scores == scores.max()]
+    return offsets, scores, best
+
+def align(seq1, seq2, method='auto', overlap='full', quiet=True):
+    """Find the best alignment of two sequences (strings), sliding the
+    shorter along the longer. Returns the (first) best offset and its score;
+    when quiet is False, the best alignment is also printed.
+
+    >>> align("ATCGCCGGATTACGGG", "CAATTCGGAT")
+    (0, 5)
+    >>> align("ATCGCCGGATTACGGG", "TTTTTATCGC") # hangs off the left end
+    (-5, 5)
+    """
+    offsets, scores, best = search(seq1, seq2, method, overlap)
+    score = int(scores.max())
+    if not quiet:
+        s1, s2 = (seq1, seq2) if len(seq1) >= len(seq2) else (seq2, seq1)
+        show_alignment(s1, s2, int(best[0]))
+        print("Best score:", score)
+        if len(best) > 1:
+            print("Tied best offsets:", ", ".join(str(k) for k in best))
+    return int(best[0]), score
+
+def main(argv):
+    """ Main entry point of the program """
+    if len(argv) == 3:
+        seq1 = next(read_fasta(argv[1]))[1] # the first record of each file
+        seq2 = next(read_fasta(argv[2]))[1]
+    else:
+        seq1 = "ATCGCCGGATTACGGG"
+        seq2 = "CAATTCGGAT"
+    align(seq1, seq2, quiet=False)
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+"""The benchmark cases: the performance examples used in the course, each
+imported from its script in the code directory and run across a range of
+input sizes.
+
+A case is a setup function registered with the `case` decorator. It takes an
+input size n, builds the inputs (outside of the timing), and returns the
+zero-argument callable that actually gets timed."""
+
+__appname__ = 'cases'
+__version__ = '0.0.1'
+
+import contextlib
+import os
+import random
+import sys
+
+# the example scripts live one level up, in the code directory
+CODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, CODE_DIR)
+
+CASES = {} # case name -> (setup function, list of input sizes)
+
+def case(name, sizes):
+    """Register the decorated setup function as benchmark `name`"""
+    def register(setup):
+        CASES[name] = (setup, sizes)
+        return setup
+    return register
+
+def quietly(f, *args):
+    """Wrap f(*args) so that whatever it prints is thrown away"""
+    def run():
+        with open(os.devnull, 'w') as devnull:
+            with contextlib.redirect_stdout(devnull):
+                return f(*args)
+    return run
+
+def random_dna(n, seed=1):
+    """A random DNA sequence of length n"""
+    rng = random.Random(seed)
+    return ''.join(rng.choice('ACGT') for i in range(n))
+
+## profiling (profileme.py, profileme2.py) ##
+
+@case('profileme.my_squares', [10 ** 4, 10 ** 5, 10 ** 6])
+def my_squares_loop(n):
+    from profileme import my_squares
+    return lambda: my_squares(n)
+
+@case('profileme2.my_squares', [10 ** 4, 10 ** 5, 10 ** 6])
+def my_squares_lc(n):
+    from profileme2 import my_squares
+    return lambda: my_squares(n)
+
+@case('profileme.my_join', [10 ** 4, 10 ** 5, 10 ** 6])
+def my_join_join(n):
+    from profileme import my_join
+    return lambda: my_join(n, "My string")
+
+@case('profileme2.my_join', [10 ** 4, 10 ** 5, 10 ** 6])
+def my_join_concat(n):
+    from profileme2 import my_join
+    return lambda: my_join(n, "My string")
+
+## vectorization (vectorize.py) ##
+
+@case('vectorize.loop_product', [10 ** 2, 10 ** 4, 10 ** 6])
+def loop_product(n):
+    import numpy as np
+    from vectorize import loop_product
+    a = np.random.rand(n)
+    b = np.random.rand(n)
+    return lambda: loop_product(a, b)
+
+@case('vectorize.vect_product', [10 ** 2, 10 ** 4, 10 ** 6])
+def vect_product(n):
+    import numpy as np
+    from vectorize import vect_product
+    a = np.random.rand(n)
+    b = np.random.rand(n)
+    return lambda: vect_product(a, b)
+
+## control flow (control_flow.py) ##
+
+@case('control_flow.is_prime', [10 ** 3 + 9, 10 ** 5 + 3, 10 ** 6 + 3])
+def is_prime(n):
+    from control_flow import is_prime
+    return quietly(is_prime, n) # n is prime, so the loop runs to the end
+
+@case('control_flow.find_all_primes', [100, 1000, 3000])
+def find_all_primes(n):
+    from control_flow import find_all_primes
+    return quietly(find_all_primes, n)
+
+## sequence alignment (align_seqs.py) ##
+
+@case('align_seqs.calculate_score', [100, 300, 1000])
+def calculate_score(n):
+    from align_seqs import calculate_score
+    s1 = random_dna(n, seed=1)
+    s2 = random_dna(n // 2, seed=2)
+    l1, l2 = len(s1), len(s2)
+    def best_score():
+        return max(calculate_score(s1, s2, l1, l2, i) for i in range(l1))
+    return quietly(best_score)
+
+@case('align_seqs_vect.score_profile', [100, 300, 1000, 10000])
+def score_profile(n):
+    from align_seqs_vect import score_profile
+    s1 = random_dna(n, seed=1)
+    s2 = random_dna(n // 2, seed=2)
+    return lambda: score_profile(s1, s2).max()
+
+@case('packed_seq.score_profile_packed', [100, 300, 1000, 10000])
+def score_profile_packed(n):
+    from packed_seq import PackedSeq, score_profile_packed
+    s1 = PackedSeq(random_dna(n, seed=1))
+    s2 = PackedSeq(random_dna(n // 2, seed=2))
+    return lambda: score_profile_packed(s1, s2).max()
+
+@case('align_seqs_vect.search', [100, 300, 1000, 10000])
+def search(n):
+    from align_seqs_vect import search
+    s1 = random_dna(n, seed=1)
+    s2 = random_dna(n // 2, seed=2)
+    return lambda: search(s1, s2, overlap='full')
+
+@case('kmer_index.seeded_search', [1000, 10000, 100000])
+def seeded_search(n):
+    from kmer_index import seeded_search
+    s1 = random_dna(n, seed=1)
+    s2 = s1[n // 4:3 * n // 4] # a similar pair, which seeding is meant for
+    return lambda: seeded_search(s1, s2)
+
+## gapped alignment (align_gapped.py), vs. the ungapped cases above ##
+
+@case('align_gapped.nw_score', [100, 300, 1000, 3000])
+def nw_score(n):
+    from align_gapped import nw_score
+    s1 = random_dna(n, seed=1)
+    s2 = random_dna(n // 2, seed=2)
+    return lambda: nw_score(s1, s2)
+
+@case('align_gapped.nw_align', [100, 300, 1000, 3000])
+def nw_align(n):
+    from align_gapped import nw_align
+    s1 = random_dna(n, seed=1)
+    s2 = random_dna(n // 2, seed=2)
+    return lambda: nw_align(s1, s2)
+
+@case('align_gapped.sw_align', [100, 300, 1000, 3000])
+def sw_align(n):
+    from align_gapped import sw_align
+    s1 = random_dna(n, seed=1)
+    s2 = random_dna(n // 2, seed=2)
+    return lambda: sw_align(s1, s2)
+
+## food webs (DrawFW.py) ##
+
+@case('DrawFW.GenRdmAdjList', [10 ** 2, 10 ** 3, 10 ** 4])
+def gen_rdm_adj_list(n):
+    from DrawFW import GenRdmAdjList
+    return lambda: GenRdmAdjList(n, 0.75)
+
+@case('foodweb_models.generate_web', [10 ** 3, 10 ** 4, 10 ** 5])
+def generate_web(n):
+    from foodweb_models import generate_web
+    return lambda: [generate_web(n, 10.0 / n, model, rng=1)
+                    for model in ('random', 'cascade', 'niche')]
+
+@case('foodweb.FoodWeb.summary', [10 ** 2, 10 ** 3, 10 ** 4])
+def foodweb_summary(n):
+    import numpy as np
+    from foodweb import FoodWeb
+    from foodweb_models import niche_web
+    web = FoodWeb.from_edges(niche_web(n, 10.0 / n, rng=1), n)
+    sources = np.arange(0, n, max(1, n // 100)) # at most 100 path sources
+    return lambda: web.summary(path_sources=sources)
+
+@case('foodweb_plot.force_layout', [10 ** 2, 10 ** 3, 10 ** 4])
+def force_layout(n):
+    from foodweb import FoodWeb
+    from foodweb_models import niche_web
+    from foodweb_plot import force_layout
+    web = FoodWeb.from_edges(niche_web(n, 10.0 / n, rng=1), n)
+    return lambda: force_layout(web, iterations=10, rng=1)
+
+## parallel computing (parallel.py) ##
+
+@case('parallel.pointless_function', [10 ** 5, 10 ** 6, 10 ** 7])
+def pointless_function(n):
+    from parallel import pointless_function
+    return lambda: pointless_function(1, size=n)
+
+@case('parallel.streaming_pointless_function', [10 ** 5, 10 ** 6, 10 ** 7])
+def streaming_pointless_function(n):
+    from parallel import streaming_pointless_function
+    return lambda: streaming_pointless_function(1, size=n)
+
+## population models (lv_models.py) ##
+
+@case('lv_models.solve_lv_batch', [10, 100, 1000])
+def solve_lv_batch(n):
+    import numpy as np
+    from lv_models import solve_lv_batch
+    t = np.linspace(0, 15, 1000)
+    r = np.random.default_rng(1).uniform(0.5, 1.5, n)
+    return lambda: solve_lv_batch(t, r=r)
+
+@case('lv_compiled.integrate', [1000, 10000, 100000])
+def lv_compiled_integrate(n):
+    import numpy as np
+    import lv_models
+    from lv_compiled import integrate
+    t = np.linspace(0, 100, n)
+    args = (1., 10., 1., 0.5, 0.5)
+    integrate(lv_models.LV, [1., 1.], t[:3], args) # compile outside the timing
+    return lambda: integrate(lv_models.LV, [1., 1.], t, args)
+
+@case('lv_stochastic.simulate', [100, 1000, 10000])
+def lv_stochastic_simulate(n):
+    from lv_stochastic import simulate
+    return lambda: simulate(1000, replicates=n, seed=1)
+
+@case('lv_spatial.frames', [128, 256, 512])
+def lv_spatial_frames(n):
+    from lv_spatial import frames, initial_state
+    state = initial_state((n, n), 1)
+    return lambda: list(frames(state, 10))
+
+## model fitting (nlls_fit.py) ##
+
+@case('nlls_fit.fit_models', [10, 100])
+def nlls_fit_models(n):
+    import numpy as np
+    from nlls_fit import N_RAND, T_DATA, fit_models
+    y = np.log(N_RAND)
+    return lambda: fit_models(T_DATA, y, starts=n, seed=1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+"""Run the benchmark suite of course performance examples.
+
+Every case in cases.py is timed at each of its input sizes, and the timings
+are appended to a history file (csv) keyed by git commit and machine. Each
+timing is compared with the most recent one recorded for the same case and
+size on the same machine at a different commit, and the run fails (exit
+status 1) if any case got slower by more than the threshold.
+
+Example (from the code directory):
+
+    python3 benchmarks/run_benchmarks.py -c align_seqs DrawFW -t 0.2
+"""
+
+__appname__ = 'run_benchmarks'
+__version__ = '0.0.1'
+
+import argparse
+import csv
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+from cases import CASES, CODE_DIR
+
+HISTORY = os.path.join(CODE_DIR, '..', 'results', 'benchmark_history.csv')
+FIELDS = ['date', 'commit', 'machine', 'case', 'size', 'seconds']
+
+def git_commit():
+    """Short hash of the checked-out commit, with '-dirty' appended if there
+    are uncommitted changes to tracked files"""
+    def git(*args):
+        return subprocess.run(['git'] + list(args), cwd=CODE_DIR,
+                              capture_output=True, text=True)
+    head = git('rev-parse', '--short', 'HEAD')
+    if head.returncode != 0:
+        return 'unknown'
+    commit = head.stdout.strip()
+    if git('status', '--porcelain', '--untracked-files=no').stdout.strip():
+        commit += '-dirty'
+    return commit
+
+def machine_id():
+    """Identify the machine, so that timings are only ever compared with
+    timings taken on the same hardware"""
+    return '%s-%s-%s' % (platform.node(), platform.machine(),
+                         platform.python_version())
+
+def time_it(f, repeat=3):
+    """Best time (in seconds) of a single call of f, out of `repeat` runs"""
+    timer = timeit.Timer(f)
+    number, _ = timer.autorange() # enough calls to take >= 0.2 s
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def read_history(path):
+    """All previously recorded timings, oldest first"""
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+def write_history(path, rows):
+    """Append rows of timings to the history file"""
+    new_file = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+def baseline(history, machine, commit, name, size):
+    """Most recent timing of (name, size) on this machine at another commit,
+    or None if there isn't one"""
+    for row in reversed(history):
+        if (row['machine'] == machine and row['commit'] != commit
+                and row['case'] == name and int(row['size']) == size):
+            return float(row['seconds'])
+    return None
+
+def select_cases(patterns):
+    """Cases whose names contain any of the patterns (all if none given)"""
+    if not patterns:
+        return sorted(CASES)
+    return sorted(name for name in CASES if any(p in name for p in patterns))
+
+def main(argv):
+    """ Main entry point of the program """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-c', '--cases', nargs='*', default=[],
+                        help='only run cases whose names contain these strings')
+    parser.add_argument('-t', '--threshold', type=float, default=0.25,
+                        help='allowed fractional slowdown (default: 0.25)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='timing repeats per case and size (default: 3)')
+    parser.add_argument('--quick', action='store_true',
+                        help='only run the smallest size of each case')
+    parser.add_argument('--history', default=HISTORY,
+                        help='history file (default: %(default)s)')
+    parser.add_argument('--no-save', action='store_true',
+                        help="don't record this run in the history file")
+    args = parser.parse_args(argv[1:])
+
+    history = read_history(args.history)
+    commit = git_commit()
+    machine = machine_id()
+    date = time.strftime('%Y-%m-%d %H:%M:%S')
+    print("Commit %s on %s" % (commit, machine))
+
+    rows = []
+    regressions = []
+    print("%-32s %10s %12s %12s %8s" % ('case', 'size', 'seconds',
+                                        'previous', 'change'))
+    for name in select_cases(args.cases):
+        setup, sizes = CASES[name]
+        for size in sizes[:1] if args.quick else sizes:
+            try:
+                f = setup(size)
+            except ImportError as e: # a dependency isn't installed
+                print("%-32s %10d  skipped (%s)" % (name, size, e))
+                break
+            seconds = time_it(f, args.repeat)
+            rows.append({'date': date, 'commit': commit, 'machine': machine,
+                         'case': name, 'size': size, 'seconds': '%.6g' % seconds})
+            previous = baseline(history, machine, commit, name, size)
+            if previous is None:
+                print("%-32s %10d %12.4g %12s %8s" % (name, size, seconds, '-', '-'))
+                continue
+            change = seconds / previous - 1
+            flag = ''
+            if change > args.threshold:
+                regressions.append((name, size, change))
+                flag = '  REGRESSION'
+            print("%-32s %10d %12.4g %12.4g %+7.1f%%%s" %
+                  (name, size, seconds, previous, 100 * change, flag))
+
+    if not args.no_save:
+        write_history(args.history, rows)
+
+    if regressions:
+        print("\n%d case(s) slowed down by more than %d%%:" %
+              (len(regressions), 100 * args.threshold))
+        for name, size, change in regressions:
+            print("  %s (size %d): %+.1f%%" % (name, size, 100 * change))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
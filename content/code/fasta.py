@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+"""A streaming reader for (multi-record, multi-line) FASTA files.
+
+Records are yielded one at a time as (header, sequence) tuples while the file
+is read line by line, so a file with many sequences is never loaded whole.
+
+Usage: python3 fasta.py file1.fasta [file2.fasta ...]"""
+
+__appname__ = 'fasta'
+__version__ = '0.0.1'
+
+import glob
+import os
+import sys
+
+FASTA_EXTENSIONS = ('.fasta', '.fa', '.fna', '.fas')
+
+def read_fasta(f):
+    """Yield the (header, sequence) records of a FASTA file, given its name
+    or an open file. The header is the text after '>', and the sequence
+    lines of each record are joined into one (uppercase) string.
+
+    >>> import io
+    >>> f = io.StringIO(">seq1 a test\\nACGT\\nacg\\n\\n>seq2\\nTTGA\\n")
+    >>> list(read_fasta(f))
+    [('seq1 a test', 'ACGTACG'), ('seq2', 'TTGA')]
+    """
+    if isinstance(f, str):
+        with open(f, 'r') as opened:
+            yield from read_fasta(opened)
+        return
+    header = None
+    lines = []
+    for line in f:
+        line = line.strip()
+        if not line or line.startswith(';'): # blank or comment line
+            continue
+        if line.startswith('>'):
+            if header is not None:
+                yield header, ''.join(lines).upper()
+            header = line[1:].strip()
+            lines = []
+        elif header is None:
+            raise ValueError("sequence data before the first '>' header")
+        else:
+            lines.append(line)
+    if header is not None:
+        yield header, ''.join(lines).upper()
+
+def record_id(header):
+    """The identifier of a record: the first word of its header
+
+    >>> record_id("gi|407228412|ref|NG_032951.1| Homo sapiens tryptase")
+    'gi|407228412|ref|NG_032951.1|'
+    """
+    return header.split(None, 1)[0] if header.strip() else header
+
+def fasta_files(directory):
+    """The FASTA files in a directory, sorted by name"""
+    return sorted(path for path in glob.glob(os.path.join(directory, '*'))
+                  if path.lower().endswith(FASTA_EXTENSIONS))
+
+def read_fasta_dir(directory):
+    """Yield the (header, sequence) records of all FASTA files in a directory"""
+    for path in fasta_files(directory):
+        yield from read_fasta(path)
+
+def main(argv):
+    """ Main entry point of the program """
+    for filename in argv[1:]:
+        for header, seq in read_fasta(filename):
+            print("%s\t%d bp" % (record_id(header), len(seq)))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
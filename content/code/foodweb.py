@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+
+"""A compact food web (directed network) data structure, and its metrics.
+
+A FoodWeb keeps its links in compressed sparse row (CSR) form: the resources
+of consumer i are indices[indptr[i]:indptr[i + 1]], with optional link
+weights alongside. That's two integer arrays for the whole web instead of the
+dict of dicts per node that networkx uses, and all the metrics below (degree
+distributions, connectance, trophic levels, shortest path lengths) are
+computed with vectorized numpy/scipy operations on those arrays.
+
+Webs can be built from an array of links (e.g., from foodweb_models.py or
+DrawFW.GenRdmAdjList) or read from an adjacency matrix csv file with an
+optional node attribute file (like ../data/QMEE_Net_Mat_edges.csv and
+../data/QMEE_Net_Mat_nodes.csv).
+
+Usage: python3 foodweb.py [edges.csv [nodes.csv]]"""
+
+__appname__ = 'foodweb'
+__version__ = '0.0.1'
+
+import csv
+import sys
+import time
+import warnings
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph, linalg
+
+## constants ##
+
+PATH_CHUNK_CELLS = 2 ** 24 # max (source, node) distances computed at once
+
+## functions ##
+
+def _read_nodes(filename):
+    """Read a node attribute csv file (first column: node id) into a list
+    of ids and a dict of attribute arrays (numeric where possible)"""
+    with open(filename, 'r', newline='') as f:
+        rows = list(csv.reader(f))
+    header, rows = rows[0], rows[1:]
+    ids = [row[0] for row in rows]
+    attrs = {}
+    for k, name in enumerate(header[1:], start=1):
+        values = [row[k] for row in rows]
+        try:
+            attrs[name] = np.array(values, dtype=np.float64)
+        except ValueError:
+            attrs[name] = np.array(values)
+    return ids, attrs
+
+class FoodWeb:
+    """A directed, optionally weighted network of S species in CSR form.
+    Links point from consumers to their resources.
+
+    >>> web = FoodWeb.from_edges([[1, 0], [2, 0], [2, 1]])
+    >>> web.S, web.L, web.connectance()
+    (3, 3, 0.3333333333333333)
+    >>> web.resources(2)
+    array([0, 1])
+    >>> web.trophic_levels()
+    array([1. , 2. , 2.5])
+    """
+
+    def __init__(self, indptr, indices, weights=None, names=None, attrs=None):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        self.S = len(self.indptr) - 1
+        self.L = len(self.indices)
+        self.names = list(names) if names is not None else list(range(self.S))
+        self.attrs = attrs if attrs is not None else {}
+
+    @classmethod
+    def from_edges(cls, edges, S=None, weights=None, names=None, attrs=None):
+        """Build a web from an array of (consumer, resource) links, with
+        species ids 0..S-1 (S defaults to the largest id + 1). Duplicate
+        links are merged (adding up their weights)."""
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        if S is None:
+            S = int(edges.max()) + 1 if len(edges) else 0
+        w = np.ones(len(edges)) if weights is None else np.asarray(weights, dtype=np.float64)
+        # sorting the links by (consumer, resource) gives CSR order
+        key = edges[:, 0] * S + edges[:, 1]
+        order = np.argsort(key, kind='stable')
+        key, w = key[order], w[order]
+        first = np.concatenate(([True], key[1:] != key[:-1])) if len(key) else key.astype(bool)
+        w = np.add.reduceat(w, np.flatnonzero(first)) if len(key) else w
+        key = key[first]
+        consumers, resources = key // S, key % S
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(consumers, minlength=S))))
+        return cls(indptr, resources, None if weights is None else w, names, attrs)
+
+    @classmethod
+    def from_adjacency_csv(cls, edges_file, nodes_file=None):
+        """Read a web from a csv adjacency matrix with node names as its
+        header (a nonzero entry in row i, column j is a link from i to j,
+        weighted by its value), and optionally a node attribute file"""
+        with open(edges_file, 'r', newline='') as f:
+            rows = list(csv.reader(f))
+        names = [name.strip() for name in rows[0]]
+        matrix = sparse.csr_matrix(np.array(rows[1:], dtype=np.float64))
+        matrix.eliminate_zeros()
+        attrs = {}
+        if nodes_file is not None:
+            ids, node_attrs = _read_nodes(nodes_file)
+            order = [ids.index(name) for name in names]
+            attrs = {key: values[order] for key, values in node_attrs.items()}
+        return cls(matrix.indptr, matrix.indices, matrix.data, names, attrs)
+
+    def __repr__(self):
+        return "FoodWeb(S=%d, L=%d)" % (self.S, self.L)
+
+    def resources(self, i):
+        """The species that species i eats"""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def edges(self):
+        """The links as an (L, 2) array of (consumer, resource)"""
+        consumers = np.repeat(np.arange(self.S), np.diff(self.indptr))
+        return np.column_stack((consumers, self.indices))
+
+    def to_scipy(self, weighted=True):
+        """The web as a scipy CSR adjacency matrix (consumers as rows)"""
+        data = self.weights if weighted and self.weights is not None else np.ones(self.L)
+        return sparse.csr_matrix((data, self.indices, self.indptr), shape=(self.S, self.S))
+
+    def to_networkx(self):
+        """The web as a networkx DiGraph (e.g., for drawing)"""
+        import networkx as nx
+        G = nx.DiGraph()
+        G.add_nodes_from(range(self.S))
+        G.add_edges_from(self.edges().tolist())
+        return G
+
+    ## metrics ##
+
+    def out_degree(self):
+        """Number of resources of each species (generality)"""
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        """Number of consumers of each species (vulnerability)"""
+        return np.bincount(self.indices, minlength=self.S)
+
+    def degree_distribution(self, kind='total'):
+        """Number of species with each degree (0, 1, 2, ...), where the
+        degree is 'out' (resources), 'in' (consumers) or 'total'
+
+        >>> FoodWeb.from_edges([[1, 0], [2, 0], [2, 1]]).degree_distribution()
+        array([0, 0, 3])
+        """
+        if kind == 'out':
+            degree = self.out_degree()
+        elif kind == 'in':
+            degree = self.in_degree()
+        elif kind == 'total':
+            degree = self.out_degree() + self.in_degree()
+        else:
+            raise ValueError("unknown kind of degree %r" % kind)
+        return np.bincount(degree)
+
+    def connectance(self):
+        """Directed connectance, L / S^2"""
+        return self.L / self.S ** 2 if self.S else 0.0
+
+    def trophic_levels(self, weighted=True):
+        """Trophic level of every species: 1 for basal species, and 1 plus
+        the (diet-weighted) mean trophic level of its resources for the rest.
+        This is the linear system (I - D) TL = 1, where D holds the diet
+        fractions, solved with a sparse solver. Raises ValueError if it has
+        no solution: some species have no food chain down to a basal species
+        (see reaches_basal), e.g. when every species eats another one.
+
+        >>> FoodWeb.from_edges([[1, 0], [2, 1], [2, 0]]).trophic_levels().tolist()
+        [1.0, 2.0, 2.5]
+        >>> FoodWeb.from_edges([[0, 1], [1, 0]]).trophic_levels()
+        Traceback (most recent call last):
+        ...
+        ValueError: trophic levels are undefined: 2 species have no path down to a basal species
+        """
+        A = self.to_scipy(weighted)
+        totals = np.asarray(A.sum(axis=1)).ravel()
+        stranded = np.count_nonzero(~self.reaches_basal(weighted))
+        if stranded: # (I - D) is singular, though spsolve may not notice
+            raise ValueError("trophic levels are undefined: %d species have no "
+                             "path down to a basal species" % stranded)
+        inverse = np.divide(1.0, totals, out=np.zeros(self.S), where=totals > 0)
+        D = sparse.diags(inverse) @ A # each row sums to 1 (or 0 if basal)
+        system = (sparse.identity(self.S, format='csc') - D).tocsc()
+        with np.errstate(all='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', linalg.MatrixRankWarning)
+            try:
+                levels = linalg.spsolve(system, np.ones(self.S))
+            except RuntimeError: # exactly singular
+                levels = np.full(self.S, np.nan)
+        levels = np.atleast_1d(levels)
+        if not np.all(np.isfinite(levels)):
+            raise ValueError("trophic levels are undefined: the system is singular")
+        return levels
+
+    def reaches_basal(self, weighted=True):
+        """Whether each species has a food chain (a path along its links, of
+        nonzero weight if weighted) down to a basal species, found by a
+        breadth-first search from all the basal species at once, up the
+        links from resources to their consumers
+
+        >>> FoodWeb.from_edges([[1, 0], [2, 3], [3, 2]]).reaches_basal().tolist()
+        [True, True, False, False]
+        """
+        edges = self.edges()
+        if weighted and self.weights is not None:
+            edges = edges[self.weights != 0]
+        basal = np.bincount(edges[:, 0], minlength=self.S) == 0
+        # links from resources up to their consumers, and from a virtual node
+        # S (where the search starts) to every basal species
+        rows = np.concatenate((edges[:, 1], np.full(basal.sum(), self.S)))
+        cols = np.concatenate((edges[:, 0], np.flatnonzero(basal)))
+        G = sparse.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                              shape=(self.S + 1, self.S + 1))
+        order = csgraph.breadth_first_order(G, self.S, directed=True,
+                                            return_predecessors=False)
+        reached = np.zeros(self.S, dtype=bool)
+        reached[order[order < self.S]] = True
+        return reached
+
+    def shortest_path_lengths(self, sources=None, directed=False):
+        """Length (in links) of the shortest path from each of the sources
+        (all species by default) to every species, as a (sources, S) array,
+        with -1 where there is no path. Paths follow links from consumers to
+        resources if directed, in either direction otherwise. All sources
+        are searched at once (a breadth-first search that expands a whole
+        frontier per step with one sparse matrix product).
+
+        >>> FoodWeb.from_edges([[1, 0], [2, 1]]).shortest_path_lengths()
+        array([[0, 1, 2],
+               [1, 0, 1],
+               [2, 1, 0]])
+        """
+        sources = np.arange(self.S) if sources is None else np.atleast_1d(sources)
+        dist = np.full((len(sources), self.S), -1, dtype=np.int64)
+        for start, d in self._path_length_chunks(sources, directed):
+            dist[start:start + len(d)] = d
+        return dist
+
+    def _path_length_chunks(self, sources, directed=False):
+        """The rows of shortest_path_lengths, a chunk of sources at a time
+        (at most PATH_CHUNK_CELLS distances): yields (index of the chunk's
+        first source, its (chunk, S) array of distances)"""
+        A = self.to_scipy(weighted=False)
+        if not directed:
+            A = A + A.T
+        A = (A != 0).astype(np.int32)
+        AT = A.T.tocsr() # frontier @ A == (A.T @ frontier.T).T
+        step = max(1, PATH_CHUNK_CELLS // max(self.S, 1))
+        for start in range(0, len(sources), step):
+            chunk = sources[start:start + step]
+            d = np.full((len(chunk), self.S), -1, dtype=np.int64)
+            frontier = np.zeros((len(chunk), self.S), dtype=np.int32)
+            frontier[np.arange(len(chunk)), chunk] = 1
+            d[np.arange(len(chunk)), chunk] = 0
+            level = 0
+            while frontier.any():
+                level += 1
+                reached = (AT @ frontier.T).T > 0
+                reached &= d < 0
+                d[reached] = level
+                frontier = reached.astype(np.int32)
+            yield start, d
+
+    def characteristic_path_length(self, sources=None):
+        """Mean shortest (undirected) path length between connected pairs,
+        summed up a chunk of sources at a time, so that memory stays bounded
+        however many species there are
+
+        >>> FoodWeb.from_edges([[1, 0], [2, 1]]).characteristic_path_length()
+        1.3333333333333333
+        """
+        sources = np.arange(self.S) if sources is None else np.atleast_1d(sources)
+        total = count = 0
+        for _, d in self._path_length_chunks(sources):
+            connected = d > 0
+            total += int(d[connected].sum())
+            count += int(np.count_nonzero(connected))
+        return total / count if count else 0.0
+
+    def summary(self, path_sources=None):
+        """A dict of the usual food web structure statistics. Path lengths
+        are averaged over all species as sources unless path_sources is
+        given (e.g., a random sample, for large webs)."""
+        out_deg, in_deg = self.out_degree(), self.in_degree()
+        edges = self.edges()
+        cannibal = np.zeros(self.S, dtype=bool)
+        cannibal[edges[edges[:, 0] == edges[:, 1], 0]] = True
+        try:
+            levels = self.trophic_levels()
+            mean_tl, max_tl = float(levels.mean()), float(levels.max())
+        except ValueError:
+            mean_tl = max_tl = float('nan')
+        return {'S': self.S, 'L': self.L,
+                'connectance': self.connectance(),
+                'links_per_species': self.L / self.S if self.S else 0.0,
+                'basal': float(np.mean(out_deg == 0)),
+                'top': float(np.mean((in_deg == 0) & (out_deg > 0))),
+                'cannibals': float(np.mean(cannibal)),
+                'mean_trophic_level': mean_tl,
+                'max_trophic_level': max_tl,
+                'path_length': self.characteristic_path_length(path_sources)}
+
+def main(argv):
+    """ Main entry point of the program """
+    if len(argv) > 1:
+        web = FoodWeb.from_adjacency_csv(argv[1], argv[2] if len(argv) > 2 else None)
+        print(web, web.names)
+        for key, value in web.summary().items():
+            print("  %s: %s" % (key, value))
+        return 0
+
+    from foodweb_models import niche_web
+    S = 10000
+    start = time.time()
+    web = FoodWeb.from_edges(niche_web(S, 0.001, rng=1), S)
+    print("%s built in %.3f s" % (web, time.time() - start))
+    start = time.time()
+    stats = web.summary(path_sources=np.arange(0, S, 100))
+    print("Summary computed in %.3f s:" % (time.time() - start))
+    for key, value in stats.items():
+        print("  %s: %s" % (key, value))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
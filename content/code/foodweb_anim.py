@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+"""Animate the abundances of the species of a food web as they change.
+
+A generated web (foodweb_models.py) is given generalised Lotka-Volterra
+dynamics: basal species grow, consumers decline without food, and every
+feeding link moves biomass from the resource to the consumer,
+
+    dN_i/dt = N_i (r_i - N_i + sum_j A_ij N_j)
+
+with A a sparse matrix built from the web's links. The abundances are
+integrated (RK4) one frame at a time, and drawn on the web, laid out and
+drawn once (foodweb_plot.py): each frame only updates the sizes and colours
+of the species' scatter, rather than redrawing the links and species as
+nx.draw would. Frames are handed straight to a streaming movie writer
+(ffmpeg or ImageMagick), or written out as numbered png files, so that long
+animations are never held in memory.
+
+Usage: python3 foodweb_anim.py [S] [C] [frames] [-o ../results/foodweb.mp4]"""
+
+__appname__ = 'foodweb_anim'
+__version__ = '0.0.1'
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+from matplotlib import animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import Normalize
+from matplotlib.figure import Figure
+from scipy import sparse
+
+from foodweb import FoodWeb
+from foodweb_models import generate_web
+from foodweb_plot import draw_web, layout
+
+## constants ##
+
+BASAL_GROWTH = 1.0 # growth rate of basal species
+CONSUMER_DEATH = -0.1 # growth rate of consumers without food
+EFFICIENCY = 0.5 # fraction of consumed biomass turned into consumer biomass
+FLOOR = 1e-6 # abundances are kept above this (for the log scale)
+
+## functions ##
+
+def glv_model(web, rng=None):
+    """Growth rates r and sparse interaction matrix A (with self limitation
+    -1 on the diagonal) of generalised Lotka-Volterra dynamics on a web.
+    Each link i -> j (i eats j) gets a random attack rate a ~ U(0, 1):
+    A_ij = EFFICIENCY a and A_ji = -a."""
+    rng = np.random.default_rng(rng)
+    edges = web.edges()
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    attack = rng.uniform(0, 1, len(edges))
+    rows = np.concatenate((edges[:, 0], edges[:, 1], np.arange(web.S)))
+    cols = np.concatenate((edges[:, 1], edges[:, 0], np.arange(web.S)))
+    data = np.concatenate((EFFICIENCY * attack, -attack, -np.ones(web.S)))
+    A = sparse.csr_matrix((data, (rows, cols)), shape=(web.S, web.S))
+    r = np.where(web.out_degree() == 0, BASAL_GROWTH, CONSUMER_DEATH)
+    return r, A
+
+def abundances(r, A, N0, dt=0.05, steps_per_frame=4):
+    """Generate the abundances at every frame (forever), starting from N0,
+    integrating dN/dt = N (r + A N) with steps_per_frame RK4 steps of dt
+    between frames. Only the current state is kept.
+
+    >>> r, A = np.array([1.0]), sparse.csr_matrix([[-1.0]])
+    >>> frames = abundances(r, A, np.array([0.1]), dt=0.1, steps_per_frame=100)
+    >>> [round(float(next(frames)[0]), 3) for _ in range(2)]
+    [0.1, 1.0]
+    """
+    def f(N):
+        return N * (r + A @ N)
+    N = np.array(N0, dtype=np.float64)
+    while True:
+        yield N
+        for _ in range(steps_per_frame):
+            k1 = f(N)
+            k2 = f(N + dt / 2 * k1)
+            k3 = f(N + dt / 2 * k2)
+            k4 = f(N + dt * k3)
+            N = np.maximum(N + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4), FLOOR)
+
+def movie_writer(filename, fps=20):
+    """A streaming matplotlib movie writer for a file: ffmpeg (mp4, gif...)
+    or ImageMagick (gif) piping the frames out as they come, or, if neither
+    is installed, Pillow for gif (which keeps all the frames in memory until
+    the end). Returns None for filenames without an extension, which are
+    written as a directory of numbered png files instead."""
+    ext = os.path.splitext(filename)[1].lower()
+    if not ext:
+        return None
+    if animation.writers.is_available('ffmpeg'):
+        return animation.FFMpegWriter(fps=fps)
+    if ext == '.gif' and animation.writers.is_available('imagemagick'):
+        return animation.ImageMagickWriter(fps=fps)
+    if ext == '.gif':
+        warnings.warn("neither ffmpeg nor ImageMagick found: Pillow keeps all "
+                      "the frames in memory until the gif is written")
+        return animation.PillowWriter(fps=fps)
+    raise RuntimeError("writing %s files needs ffmpeg; write a .gif, or a "
+                       "directory of png frames (no extension), instead" % ext)
+
+def animate(web, filename, frames=200, kind='trophic', rng=None, fps=20,
+            dt=0.05, steps_per_frame=4, figsize=(6, 6), dpi=100):
+    """Animate Lotka-Volterra abundance dynamics on a web (from random
+    initial abundances), and write the frames to filename (see
+    movie_writer). Species are sized and coloured by log10 abundance.
+    Returns the final abundances."""
+    rng = np.random.default_rng(rng)
+    r, A = glv_model(web, rng)
+    N = rng.uniform(0.1, 1, web.S)
+    extra = {'body_size': rng.uniform(-10, 10, web.S)} if kind == 'trophic' else {}
+    pos = layout(web, kind, **extra)
+
+    # the static part of the figure is drawn once...
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.set_axis_off()
+    draw_web(web, pos, ax)
+    nodes = ax.collections[-1]
+    nodes.set_cmap('viridis')
+    nodes.set_norm(Normalize(np.log10(FLOOR), 1))
+    fig.colorbar(nodes, ax=ax, label='log10 abundance', shrink=0.6)
+    title = ax.set_title('')
+    max_size = max(20.0, 3000.0 / np.sqrt(max(web.S, 1)))
+
+    # ...and each frame only changes the species' sizes and colours
+    def update(i, N):
+        logN = np.log10(N)
+        nodes.set_sizes(max_size * (logN - np.log10(FLOOR)) / -np.log10(FLOOR))
+        nodes.set_array(logN)
+        title.set_text('t = %.1f, %d species above %g' %
+                       (i * dt * steps_per_frame, (N > 1e-3).sum(), 1e-3))
+
+    writer = movie_writer(filename, fps)
+    states = abundances(r, A, N, dt, steps_per_frame)
+    if writer is None:
+        os.makedirs(filename, exist_ok=True)
+        for i in range(frames):
+            N = next(states)
+            update(i, N)
+            fig.savefig(os.path.join(filename, 'frame_%05d.png' % i))
+    else:
+        with writer.saving(fig, filename, dpi):
+            for i in range(frames):
+                N = next(states)
+                update(i, N)
+                writer.grab_frame()
+    return N
+
+def main(argv):
+    """ Main entry point of the program """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('S', type=int, nargs='?', default=50, help='number of species')
+    parser.add_argument('C', type=float, nargs='?', default=0.1, help='connectance')
+    parser.add_argument('frames', type=int, nargs='?', default=200, help='number of frames')
+    parser.add_argument('-m', '--model', default='niche', help='food web model (default: niche)')
+    parser.add_argument('-l', '--layout', default='trophic', help='layout (default: trophic)')
+    parser.add_argument('-s', '--seed', type=int, default=1, help='random seed')
+    parser.add_argument('-o', '--output', default='../results/foodweb.gif',
+                        help='movie file, or directory for png frames (default: %(default)s)')
+    args = parser.parse_args(argv[1:])
+
+    rng = np.random.default_rng(args.seed)
+    web = FoodWeb.from_edges(generate_web(args.S, args.C, args.model, rng), args.S)
+    start = time.time()
+    N = animate(web, args.output, args.frames, args.layout, rng)
+    print("%s: %d frames written to %s in %.1f s (%d species left)" %
+          (web, args.frames, os.path.normpath(args.output), time.time() - start,
+           (N > 1e-3).sum()))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+"""Ensembles of random food webs over grids of size and connectance.
+
+Instead of one web of fixed size and connectance (as in DrawFW.py), many
+replicate webs are generated for every combination of a list of sizes (N)
+and connectances (C), spread across a pool of worker processes, and the
+structure of each one is summarised (foodweb.FoodWeb.summary). Every web
+gets its own random number stream, spawned from one seed with
+numpy.random.SeedSequence, so the results are reproducible and don't depend
+on the number of processes or the order in which webs are finished. The rows
+are written out as they come in, to a csv file, or to a Parquet file (if
+pyarrow is installed) in batches, so that large sweeps never need to be held
+in memory.
+
+Usage: python3 foodweb_ensemble.py [-N 10 30 100] [-C 0.05 0.1] [-r 10]
+                                   [-m random] [-o ../results/foodweb_ensemble.csv]"""
+
+__appname__ = 'foodweb_ensemble'
+__version__ = '0.0.1'
+
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from foodweb import FoodWeb
+from foodweb_models import MODELS, generate_web
+
+## constants ##
+
+PATH_SOURCES = 100 # species sampled as sources for path lengths, per web
+BATCH_ROWS = 1000 # rows per Parquet row group (or csv flush)
+
+## functions ##
+
+def _tasks(Ns, Cs, replicates, model, seed):
+    """One (model, N, C, replicate, task number, SeedSequence) per web, with
+    the random streams spawned from seed in a fixed order"""
+    grid = list(itertools.product(Ns, Cs, range(replicates)))
+    streams = np.random.SeedSequence(seed).spawn(len(grid))
+    for task, ((N, C, rep), stream) in enumerate(zip(grid, streams)):
+        yield model, N, C, rep, task, stream
+
+def _run_web(task):
+    """Generate one web and return its row of summary statistics (with nan
+    trophic levels if they are undefined, see FoodWeb.trophic_levels)"""
+    model, N, C, rep, number, stream = task
+    rng = np.random.default_rng(stream)
+    web = FoodWeb.from_edges(generate_web(N, C, model, rng), N)
+    sources = None
+    if N > PATH_SOURCES:
+        sources = rng.choice(N, PATH_SOURCES, replace=False)
+    row = {'model': model, 'N': N, 'C': C, 'replicate': rep, 'task': number}
+    row.update(web.summary(path_sources=sources))
+    return row
+
+def run_ensemble(Ns, Cs, replicates=10, model='random', seed=None,
+                 processes=None, chunksize=8):
+    """Generate `replicates` webs of every size in Ns and connectance in Cs
+    with one of foodweb_models.MODELS, and yield a dict of summary
+    statistics per web (in whatever order they are finished). Webs are made
+    in a pool of `processes` worker processes (all the cores by default; 1
+    runs everything in this process).
+
+    >>> rows = list(run_ensemble([20], [0.1, 0.2], 2, seed=1, processes=1))
+    >>> [(row['C'], row['replicate']) for row in rows]
+    [(0.1, 0), (0.1, 1), (0.2, 0), (0.2, 1)]
+    >>> sorted(rows[0])[:5]
+    ['C', 'L', 'N', 'S', 'basal']
+    """
+    if model not in MODELS:
+        raise ValueError("unknown model %r (use one of %s)" % (model, ', '.join(MODELS)))
+    if model == 'niche' and max(Cs) >= 0.5:
+        raise ValueError("the niche model needs C < 0.5")
+    tasks = _tasks(Ns, Cs, replicates, model, seed)
+    if processes == 1:
+        for task in tasks:
+            yield _run_web(task)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for row in pool.imap_unordered(_run_web, tasks, chunksize):
+            yield row
+
+def count_undefined(rows, counts):
+    """Pass rows through, counting in the dict counts the webs whose trophic
+    levels are undefined ('undefined'), and those of them with no basal
+    species at all ('no_basal')"""
+    counts.setdefault('undefined', 0)
+    counts.setdefault('no_basal', 0)
+    for row in rows:
+        if np.isnan(row['mean_trophic_level']):
+            counts['undefined'] += 1
+            counts['no_basal'] += row['basal'] == 0
+        yield row
+
+def write_rows(rows, filename):
+    """Write rows (dicts with the same keys) to a csv file, or a Parquet
+    file if filename ends in .parquet, as they come. Returns the number of
+    rows written."""
+    if filename.endswith('.parquet'):
+        return _write_parquet(iter(rows), filename)
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    n = 0
+    with open(filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(first))
+        writer.writeheader()
+        for row in itertools.chain([first], rows):
+            writer.writerow(row)
+            n += 1
+            if n % BATCH_ROWS == 0:
+                f.flush()
+    return n
+
+def _write_parquet(rows, filename):
+    """Write rows to a Parquet file, BATCH_ROWS rows per row group"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("writing Parquet files needs pyarrow "
+                          "(pip install pyarrow), or write a .csv file instead")
+    n = 0
+    writer = None
+    try:
+        while True:
+            batch = list(itertools.islice(rows, BATCH_ROWS))
+            if not batch:
+                break
+            table = pyarrow.Table.from_pylist(batch)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(filename, table.schema)
+            writer.write_table(table)
+            n += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return n
+
+def main(argv):
+    """ Main entry point of the program """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-N', type=int, nargs='+', default=[10, 30, 100],
+                        help='numbers of species (default: %(default)s)')
+    parser.add_argument('-C', type=float, nargs='+', default=[0.05, 0.1, 0.2],
+                        help='connectances (default: %(default)s)')
+    parser.add_argument('-r', '--replicates', type=int, default=10,
+                        help='webs per (N, C) (default: %(default)s)')
+    parser.add_argument('-m', '--model', choices=MODELS, default='random',
+                        help='food web model (default: %(default)s)')
+    parser.add_argument('-s', '--seed', type=int, default=None,
+                        help='random seed (default: a fresh one, printed)')
+    parser.add_argument('-p', '--processes', type=int, default=None,
+                        help='number of worker processes (default: all cores)')
+    parser.add_argument('-o', '--output', default='../results/foodweb_ensemble.csv',
+                        help='csv or .parquet output file (default: %(default)s)')
+    args = parser.parse_args(argv[1:])
+
+    seed = args.seed
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+        print("Seed: %d" % seed)
+    start = time.time()
+    rows = run_ensemble(args.N, args.C, args.replicates, args.model, seed,
+                        args.processes)
+    counts = {}
+    n = write_rows(count_undefined(rows, counts), args.output)
+    print("%d webs summarised in %.2f s, written to %s" %
+          (n, time.time() - start, os.path.normpath(args.output)))
+    if counts['undefined']:
+        print("%d webs (%d with no basal species) have undefined trophic levels, "
+              "written as nan" % (counts['undefined'], counts['no_basal']))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
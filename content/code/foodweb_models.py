@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+"""Random food web generators, vectorized with numpy.
+
+All the links of a web are drawn in a few batched numpy calls from a seeded
+numpy.random.Generator, instead of one at a time in a Python loop, so that
+webs with 10^5 species take milliseconds. Webs are returned as an array of
+links (one row per link: consumer id, resource id, as in DrawFW.py), or as a
+sparse (scipy CSR) adjacency matrix with consumers as rows.
+
+The models, for S species and connectance C (links / S^2):
+    random:  every possible link is present with probability C
+    cascade: species are ranked, and each one eats each lower ranked species
+             with probability 2CS/(S - 1) (Cohen & Newman 1985)
+    niche:   each species has a niche value, and eats every species whose
+             niche value falls in a range of its own (Williams & Martinez 2000)
+
+Usage: python3 foodweb_models.py [S] [C] [model]"""
+
+__appname__ = 'foodweb_models'
+__version__ = '0.0.1'
+
+import sys
+import time
+
+import numpy as np
+
+## constants ##
+
+MODELS = ('random', 'cascade', 'niche')
+
+## functions ##
+
+def _sorted_unique(x):
+    """Sorted distinct values of an integer array (faster than np.unique)"""
+    x = np.sort(x)
+    return x[np.concatenate(([True], x[1:] != x[:-1]))] if len(x) else x
+
+def _sample_distinct(M, L, rng):
+    """L distinct integers drawn uniformly from 0..M-1, sorted"""
+    if L > M:
+        raise ValueError("can't draw %d distinct values out of %d" % (L, M))
+    if M <= 10 ** 7 or 2 * L > M:
+        return np.sort(rng.choice(M, L, replace=False))
+    picked = _sorted_unique(rng.integers(0, M, L))
+    while len(picked) < L: # top up the (few) draws lost to duplicates
+        more = rng.integers(0, M, L - len(picked))
+        picked = _sorted_unique(np.concatenate((picked, more)))
+    return picked
+
+def random_web(S, C, rng=None, cannibalism=False):
+    """Links of a random (Erdos-Renyi) web: each of the S^2 possible links
+    (S(S - 1) without cannibalism) is present with probability C
+
+    >>> edges = random_web(1000, 0.01, rng=1)
+    >>> bool((edges[:, 0] != edges[:, 1]).all()), len(edges) // 1000
+    (True, 9)
+    """
+    rng = np.random.default_rng(rng)
+    M = S * S if cannibalism else S * (S - 1)
+    k = _sample_distinct(M, rng.binomial(M, C), rng)
+    if cannibalism:
+        return np.column_stack((k // S, k % S))
+    consumer, resource = k // (S - 1), k % (S - 1)
+    resource += resource >= consumer # skip the diagonal
+    return np.column_stack((consumer, resource))
+
+def cascade_web(S, C, rng=None):
+    """Links of a cascade model web: species j eats each species i < j with
+    probability 2CS/(S - 1), so that the expected connectance is C"""
+    rng = np.random.default_rng(rng)
+    M = S * (S - 1) // 2 # the pairs i < j
+    p = min(1.0, 2 * C * S / (S - 1)) if S > 1 else 0.0
+    k = _sample_distinct(M, rng.binomial(M, p), rng)
+    # invert k = j(j - 1)/2 + i to get the pair (i < j)
+    j = ((1 + np.sqrt(1 + 8 * k.astype(np.float64))) // 2).astype(np.int64)
+    j -= j * (j - 1) // 2 > k # guard against floating point rounding
+    j += (j + 1) * j // 2 <= k
+    i = k - j * (j - 1) // 2
+    return np.column_stack((j, i))
+
+def niche_web(S, C, rng=None, cannibalism=False, return_niche=False):
+    """Links of a niche model web: each species i has a niche value n_i, a
+    feeding range r_i = x n_i (x ~ Beta(1, 1/(2C) - 1)) centred at c_i ~
+    U(r_i/2, n_i), and eats the species whose niche values are in it. The
+    species with the lowest niche value gets no range (it is basal). Also
+    returns the niche values if return_niche is True.
+
+    >>> edges = niche_web(100, 0.1, rng=42)
+    >>> bool(abs(len(edges) / 100 ** 2 - 0.1) < 0.05)
+    True
+    """
+    rng = np.random.default_rng(rng)
+    beta = 1 / (2 * C) - 1
+    niche = rng.uniform(0, 1, S)
+    ranges = niche * rng.beta(1, beta, S)
+    ranges[np.argmin(niche)] = 0
+    centres = rng.uniform(ranges / 2, niche)
+    # the prey of each species are a contiguous block of the sorted niches
+    order = np.argsort(niche)
+    sorted_niche = niche[order]
+    lo = np.searchsorted(sorted_niche, centres - ranges / 2, side='left')
+    hi = np.searchsorted(sorted_niche, centres + ranges / 2, side='right')
+    counts = hi - lo
+    consumer = np.repeat(np.arange(S), counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    resource = order[np.repeat(lo, counts) + within]
+    edges = np.column_stack((consumer, resource))
+    if not cannibalism:
+        edges = edges[consumer != resource]
+    if return_niche:
+        return edges, niche
+    return edges
+
+def rdm_adj_list(N=2, C=0.5, rng=None):
+    """The links that DrawFW.GenRdmAdjList draws, all at once: each of N
+    trials draws a random pair of nodes with probability C, and pairs that
+    are self loops are dropped"""
+    rng = np.random.default_rng(rng)
+    links = rng.integers(0, N, (rng.binomial(N, C), 2))
+    return links[links[:, 0] != links[:, 1]]
+
+def to_adjacency(edges, S):
+    """Sparse S x S adjacency matrix (CSR) of a web: A[i, j] = 1 if i eats j
+
+    >>> to_adjacency(np.array([[0, 1], [2, 1]]), 3).toarray()
+    array([[0, 1, 0],
+           [0, 0, 0],
+           [0, 1, 0]], dtype=int8)
+    """
+    from scipy import sparse
+    data = np.ones(len(edges), dtype=np.int8)
+    return sparse.csr_matrix((data, (edges[:, 0], edges[:, 1])), shape=(S, S))
+
+def generate_web(S, C, model='random', rng=None, output='edges', **kwargs):
+    """Generate a web of S species with connectance C from one of MODELS,
+    as an array of links (output='edges') or a sparse adjacency matrix
+    (output='sparse'). rng is a numpy Generator or a seed.
+
+    >>> generate_web(5, 0.3, 'cascade', rng=0, output='sparse').shape
+    (5, 5)
+    """
+    if model == 'random':
+        edges = random_web(S, C, rng, **kwargs)
+    elif model == 'cascade':
+        edges = cascade_web(S, C, rng, **kwargs)
+    elif model == 'niche':
+        edges = niche_web(S, C, rng, **kwargs)
+    else:
+        raise ValueError("unknown model %r (use one of %s)" % (model, ', '.join(MODELS)))
+    if output == 'edges':
+        return edges
+    if output == 'sparse':
+        return to_adjacency(edges, S)
+    raise ValueError("unknown output %r" % output)
+
+def main(argv):
+    """ Main entry point of the program """
+    S = int(argv[1]) if len(argv) > 1 else 100000
+    C = float(argv[2]) if len(argv) > 2 else 0.0001
+    models = [argv[3]] if len(argv) > 3 else MODELS
+    for model in models:
+        start = time.time()
+        edges = generate_web(S, C, model, rng=1)
+        print("%-8s S = %d, %d links (connectance %.3g) in %.1f ms" %
+              (model, S, len(edges), len(edges) / S ** 2,
+               1000 * (time.time() - start)))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+
+"""Fast layouts and plots of (large) food webs.
+
+DrawFW.py lays a web out with nx.circular_layout and draws it with nx.draw,
+which builds a networkx graph and draws every link as its own matplotlib
+artist: fine for 30 species, very slow for thousands, and the layout is
+recomputed for every figure. Here:
+
+    * layouts are computed with numpy on FoodWeb (foodweb.py) arrays:
+      circular, trophic (trophic level against log body size), and a
+      Barnes-Hut style force directed layout
+    * layouts are cached per web (keyed by a hash of its links), so
+      replotting the same web doesn't lay it out again
+    * all the links are drawn as a single LineCollection, and all the
+      species as a single scatter
+    * figures are made without pyplot (on an Agg canvas), so that plots can
+      be written to png/svg/pdf files in batch, without a display
+
+Usage: python3 foodweb_plot.py [S] [number of webs]"""
+
+__appname__ = 'foodweb_plot'
+__version__ = '0.0.1'
+
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from foodweb import FoodWeb
+
+## constants ##
+
+LAYOUTS = ('circular', 'trophic', 'force')
+EXACT_NODES = 1000 # force layout: exact repulsion between all pairs below this
+MAX_CACHED = 256 # layouts kept in the cache
+RASTERIZE_LINKS = 10000 # draw more links than this as an image in svg/pdf
+
+_cache = {}
+
+## functions ##
+
+def web_hash(web):
+    """A hash of the links of a web, and their weights (which trophic
+    levels depend on), to recognise it again"""
+    h = hashlib.sha1(np.int64(web.S).tobytes())
+    h.update(web.indptr.tobytes())
+    h.update(web.indices.tobytes())
+    if web.weights is not None:
+        h.update(b'weights')
+        h.update(web.weights.tobytes())
+    return h.hexdigest()
+
+def circular_layout(S):
+    """Positions of S nodes evenly spaced on the unit circle, as an (S, 2)
+    array
+
+    >>> circular_layout(4).round(3)
+    array([[ 1.,  0.],
+           [ 0.,  1.],
+           [-1.,  0.],
+           [-0., -1.]])
+    """
+    theta = 2 * np.pi * np.arange(S) / max(S, 1)
+    return np.column_stack((np.cos(theta), np.sin(theta)))
+
+def trophic_layout(web, body_size=None, rng=None):
+    """Positions with trophic level on the y axis, and log10 body size on
+    the x axis (random if not given). If the trophic levels are undefined
+    (loops with no basal species), the shortest food chain length to a
+    basal species (+ 1) is used instead."""
+    rng = np.random.default_rng(rng)
+    try:
+        levels = web.trophic_levels()
+    except ValueError:
+        basal = np.flatnonzero(web.out_degree() == 0)
+        chain = web.shortest_path_lengths(basal, directed=False).astype(np.float64)
+        chain[chain < 0] = np.inf
+        levels = 1 + (chain.min(axis=0) if len(basal) else np.zeros(web.S))
+        levels[~np.isfinite(levels)] = 1
+    x = rng.uniform(-1, 1, web.S) if body_size is None else np.asarray(body_size, dtype=np.float64)
+    return np.column_stack((x, levels))
+
+def _repulsion_exact(pos, k2):
+    """Fruchterman-Reingold repulsion (k^2 / d) between all pairs of nodes"""
+    delta = pos[:, None, :] - pos[None, :, :]
+    d2 = np.maximum((delta ** 2).sum(axis=-1), 1e-9)
+    return (delta * (k2 / d2)[..., None]).sum(axis=1)
+
+def _repulsion_grid(pos, k2, grid):
+    """Approximate repulsion, Barnes-Hut style, on grid x grid cells of
+    (about) S / grid^2 nodes each: nodes are split into grid vertical strips
+    by x, and each strip into grid cells by y (a one level k-d tree, so the
+    cells stay balanced when the layout is clustered). Nodes in the same
+    cell repel each other exactly, and every other cell acts as one
+    pseudo-node of its total mass at its centre of mass."""
+    S = len(pos)
+    strip = np.empty(S, dtype=np.int64)
+    strip[np.argsort(pos[:, 0], kind='stable')] = np.arange(S) * grid // S
+    order = np.lexsort((pos[:, 1], strip)) # by strip, then by y
+    sizes = np.bincount(strip, minlength=grid)
+    in_strip = np.arange(S) - (np.cumsum(sizes) - sizes)[strip[order]]
+    cell = np.empty(S, dtype=np.int64)
+    cell[order] = strip[order] * grid + in_strip * grid // sizes[strip[order]]
+    mass = np.bincount(cell, minlength=grid * grid).astype(np.float64)
+    centre = np.column_stack([np.bincount(cell, pos[:, d], minlength=grid * grid)
+                              for d in (0, 1)])
+    occupied = np.flatnonzero(mass)
+    centre = centre[occupied] / mass[occupied, None]
+    mass = mass[occupied]
+
+    # far field: every node against every occupied cell's centre of mass,
+    # without its own cell
+    force = np.zeros_like(pos)
+    own = np.searchsorted(occupied, cell)
+    step = max(1, 2 ** 22 // len(occupied))
+    for start in range(0, S, step):
+        dx = pos[start:start + step, 0, None] - centre[:, 0]
+        dy = pos[start:start + step, 1, None] - centre[:, 1]
+        weight = (k2 * mass) / np.maximum(dx * dx + dy * dy, 1e-9)
+        weight[np.arange(len(dx)), own[start:start + step]] = 0
+        force[start:start + step, 0] = (dx * weight).sum(axis=1)
+        force[start:start + step, 1] = (dy * weight).sum(axis=1)
+
+    # near field: exact pairs within each cell (all pairs of each run of
+    # nodes that share a cell, which are consecutive in order)
+    sorted_cell = cell[order]
+    starts = np.flatnonzero(np.concatenate(([True], sorted_cell[1:] != sorted_cell[:-1])))
+    counts = np.diff(np.append(starts, S))
+    firsts = np.repeat(starts, counts)
+    sizes = np.repeat(counts, counts)
+    a = np.repeat(np.arange(S), sizes) # each node against its whole cell
+    b = np.repeat(firsts, sizes) + (np.arange(sizes.sum()) -
+                                    np.repeat(np.cumsum(sizes) - sizes, sizes))
+    a, b = order[a], order[b]
+    keep = a != b
+    a, b = a[keep], b[keep]
+    delta = pos[a] - pos[b]
+    d2 = np.maximum((delta ** 2).sum(axis=-1), 1e-9)
+    push = delta * (k2 / d2)[:, None]
+    for d in (0, 1):
+        force[:, d] += np.bincount(a, push[:, d], minlength=S)
+    return force
+
+def force_layout(web, iterations=50, rng=None, pos=None, grid=None, gravity=1.0):
+    """Force directed (Fruchterman-Reingold) positions: linked species
+    attract each other, all species repel each other and are pulled towards
+    the centre (by gravity), and the moves are capped by a temperature that
+    cools down over the iterations. Above EXACT_NODES species, the repulsion
+    is approximated on a grid of cells (see _repulsion_grid), so that an
+    iteration costs O(S * cells) rather than O(S^2). Starts from pos
+    (default: random)."""
+    rng = np.random.default_rng(rng)
+    S = web.S
+    pos = rng.uniform(-1, 1, (S, 2)) if pos is None else np.array(pos, dtype=np.float64)
+    if S < 2:
+        return pos
+    if grid is None and S > EXACT_NODES:
+        grid = int(S ** 0.25) # balances the far and near field costs
+    edges = web.edges()
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    k = 2.0 / np.sqrt(S) # ideal distance, for a layout of width about 2
+    temperature = 0.1
+    for step in range(iterations):
+        if grid:
+            force = _repulsion_grid(pos, k * k, grid)
+        else:
+            force = _repulsion_exact(pos, k * k)
+        delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+        pull = delta * (np.sqrt((delta ** 2).sum(axis=1)) / k)[:, None]
+        for d in (0, 1):
+            force[:, d] -= np.bincount(edges[:, 0], pull[:, d], minlength=S)
+            force[:, d] += np.bincount(edges[:, 1], pull[:, d], minlength=S)
+        force -= gravity * pos # keeps disconnected species from drifting off
+        length = np.maximum(np.sqrt((force ** 2).sum(axis=1)), 1e-9)
+        pos += force * (np.minimum(length, temperature) / length)[:, None]
+        temperature *= 1 - 1.0 / iterations
+    return pos
+
+def _cache_args(kwargs):
+    """A hashable version of layout arguments, or None if any of them is not
+    a plain number (or numeric array), e.g. a Generator, whose state the key
+    would not capture"""
+    args = []
+    for name, value in sorted(kwargs.items()):
+        if value is None:
+            args.append((name, None))
+            continue
+        if isinstance(value, (np.random.Generator, np.random.SeedSequence)):
+            return None
+        value = np.asarray(value)
+        if value.dtype.kind not in 'biuf':
+            return None
+        args.append((name, value.dtype.str, value.shape, value.tobytes()))
+    return tuple(args)
+
+def layout(web, kind='circular', cache=True, **kwargs):
+    """Positions of the species of a web, as an (S, 2) array, using one of
+    LAYOUTS. Layouts are cached per web (and arguments) unless cache is
+    False; randomised layouts are seeded (rng=0) so that cached and fresh
+    ones agree. Arguments that are not plain numbers or numeric arrays,
+    such as an rng that is a np.random.Generator, bypass the cache, so that
+    every call draws a new layout.
+
+    >>> web = FoodWeb.from_edges([[1, 0], [2, 1]])
+    >>> layout(web, 'trophic', body_size=[0, 1, 2]).tolist()
+    [[0.0, 1.0], [1.0, 2.0], [2.0, 3.0]]
+    """
+    if kind not in LAYOUTS:
+        raise ValueError("unknown layout %r (use one of %s)" % (kind, ', '.join(LAYOUTS)))
+    kwargs.setdefault('rng', 0)
+    key = None
+    if cache:
+        args = _cache_args(kwargs)
+        cache = args is not None
+    if cache:
+        key = (web_hash(web), kind, args)
+        if key in _cache:
+            return _cache[key].copy()
+    if kind == 'circular':
+        pos = circular_layout(web.S)
+    elif kind == 'trophic':
+        pos = trophic_layout(web, **kwargs)
+    else:
+        pos = force_layout(web, **kwargs)
+    if cache:
+        if len(_cache) >= MAX_CACHED:
+            del _cache[next(iter(_cache))] # the oldest
+        _cache[key] = pos.copy()
+    return pos
+
+def draw_web(web, pos, ax, node_size=None, node_color='C0', edge_color='0.5',
+             edge_width=0.5, edge_alpha=0.3):
+    """Draw a web on a matplotlib axes: its links as a LineCollection and
+    its species as a scatter, sized by node_size (an array of areas, or a
+    single value). Above RASTERIZE_LINKS links, the links are rasterized
+    in vector (svg, pdf) output, which would otherwise hold every line."""
+    if node_size is None:
+        node_size = max(2.0, 300.0 / np.sqrt(max(web.S, 1)))
+    edges = web.edges()
+    segments = pos[edges] # (L, 2 ends, 2 coordinates)
+    ax.add_collection(LineCollection(segments, colors=edge_color,
+                                     linewidths=edge_width, alpha=edge_alpha,
+                                     rasterized=web.L > RASTERIZE_LINKS, zorder=1))
+    ax.scatter(pos[:, 0], pos[:, 1], s=node_size, c=node_color,
+               edgecolors='none', zorder=2)
+    ax.autoscale_view()
+    return ax
+
+def plot_web(web, filename=None, kind='circular', node_size=None,
+             figsize=(6, 6), dpi=100, **kwargs):
+    """Lay out and draw a web on a new figure, without pyplot, and save it
+    to filename (format from its extension: png, svg, pdf...) if given.
+    Returns the figure. Extra arguments go to layout()."""
+    pos = layout(web, kind, **kwargs)
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    draw_web(web, pos, ax, node_size)
+    if kind == 'trophic':
+        ax.set_xlabel('log10 body size')
+        ax.set_ylabel('Trophic level')
+    else:
+        ax.set_axis_off()
+    if filename is not None:
+        fig.savefig(filename)
+    return fig
+
+def main(argv):
+    """ Main entry point of the program """
+    from foodweb_models import niche_web
+    S = int(argv[1]) if len(argv) > 1 else 2000
+    nwebs = int(argv[2]) if len(argv) > 2 else 3
+    outdir = '../results'
+    rng = np.random.default_rng(1)
+    for i in range(nwebs):
+        web = FoodWeb.from_edges(niche_web(S, 10.0 / S, rng), S)
+        sizes = rng.uniform(-10, 10, S) # log10 body sizes, as in DrawFW.py
+        for kind in LAYOUTS:
+            start = time.time()
+            extra = {'body_size': sizes} if kind == 'trophic' else {}
+            filename = os.path.join(outdir, 'foodweb_%d_%s.png' % (i, kind))
+            plot_web(web, filename, kind, **extra)
+            print("%s (%s layout) plotted to %s in %.2f s" %
+                  (web, kind, filename, time.time() - start))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
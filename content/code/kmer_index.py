@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+"""Seeded ungapped alignment: a k-mer index proposes the offsets worth scoring.
+
+Instead of scoring every offset of one sequence along the other (l1 + l2 - 1
+of them), the k-mers (substrings of length k) of the longer sequence are
+indexed, the k-mers of the shorter sequence are looked up in that index, and
+every shared k-mer (a "seed") votes for the offset (diagonal) that lines the
+two copies up. Only the offsets with enough votes are then scored exactly, so
+similar sequences cost roughly linear rather than quadratic time.
+
+K-mers are encoded as integers at 2 bits per base (k <= 31), and the index is
+a sorted array of k-mer codes with their positions, so that all the lookups
+for a query are done at once with a binary search (np.searchsorted) instead
+of one dictionary access at a time. K-mers containing ambiguous bases (N etc.)
+are left out.
+
+Usage: python3 kmer_index.py [-k 12] [seq1.fasta seq2.fasta]"""
+
+__appname__ = 'kmer_index'
+__version__ = '0.0.1'
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from align_seqs_vect import encode, search
+from fasta import read_fasta
+from packed_seq import CODES
+
+## constants ##
+
+K = 12
+MAX_OCCURRENCES = 100 # ignore k-mers this common in the index (repeats)
+CHUNK_CELLS = 2 ** 22 # max bases compared at once when scoring
+
+## functions ##
+
+def kmer_codes(seq, k=K):
+    """The 2-bit integer code of every k-mer of a sequence (string or encoded
+    array), with -1 for k-mers that contain an ambiguous base
+
+    >>> kmer_codes("ACGTNAC", 2)
+    array([ 1,  6, 11, -1, -1,  1])
+    """
+    if not 1 <= k <= 31:
+        raise ValueError("k must be between 1 and 31")
+    codes = CODES[encode(seq) if isinstance(seq, str) else seq]
+    n = len(codes) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+    kmers = np.zeros(n, dtype=np.int64)
+    bad = np.zeros(n, dtype=bool)
+    for t in range(k): # shift in one base of every k-mer at a time
+        window = codes[t:t + n]
+        kmers = kmers * 4 + np.where(window == 255, 0, window)
+        bad |= window == 255
+    kmers[bad] = -1
+    return kmers
+
+class KmerIndex:
+    """Sorted index of the k-mers of a sequence and where they occur
+
+    >>> index = KmerIndex("ACGTACGTTT", k=4)
+    >>> index.positions("ACGT")
+    array([0, 4])
+    """
+
+    def __init__(self, seq, k=K, max_occurrences=MAX_OCCURRENCES):
+        self.k = k
+        self.length = len(seq)
+        kmers = kmer_codes(seq, k)
+        positions = np.flatnonzero(kmers >= 0)
+        order = np.argsort(kmers[positions], kind='stable')
+        self.kmers = kmers[positions][order]
+        self.starts = positions[order]
+        # drop k-mers that occur too often: they'd vote for too many offsets
+        if len(self.kmers):
+            counts = np.unique(self.kmers, return_counts=True)[1]
+            keep = np.repeat(counts <= max_occurrences, counts)
+            self.kmers = self.kmers[keep]
+            self.starts = self.starts[keep]
+
+    def positions(self, kmer):
+        """Where a k-mer (string) occurs in the indexed sequence"""
+        code = kmer_codes(kmer, self.k)[0]
+        lo, hi = np.searchsorted(self.kmers, [code, code + 1])
+        return self.starts[lo:hi]
+
+    def seeds(self, query):
+        """All (position in indexed sequence, position in query) pairs of
+        shared k-mers, as two arrays"""
+        kmers = kmer_codes(query, self.k)
+        qpos = np.flatnonzero(kmers >= 0)
+        lo = np.searchsorted(self.kmers, kmers[qpos], side='left')
+        hi = np.searchsorted(self.kmers, kmers[qpos], side='right')
+        counts = hi - lo
+        qpos = np.repeat(qpos, counts)
+        # positions lo, lo + 1, ..., hi - 1 of every hit, all concatenated
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.starts[np.repeat(lo, counts) + within], qpos
+
+    def candidate_offsets(self, query, min_seeds=2, max_candidates=None):
+        """Offsets of the query along the indexed sequence that are supported
+        by at least min_seeds shared k-mers (at most max_candidates of them,
+        those with the most seeds), in increasing order"""
+        spos, qpos = self.seeds(query)
+        offsets, votes = np.unique(spos - qpos, return_counts=True)
+        offsets = offsets[votes >= min_seeds]
+        votes = votes[votes >= min_seeds]
+        if max_candidates is not None and len(offsets) > max_candidates:
+            top = np.argsort(-votes, kind='stable')[:max_candidates]
+            offsets = np.sort(offsets[top])
+        return offsets
+
+def score_offsets(s1, s2, offsets):
+    """Number of matching bases of s2 against s1 at each of the given offsets
+    (startpoints of s2 along s1, negative if it hangs off the left end)
+
+    >>> score_offsets("CAATTCGGAT", "ATCG", np.array([-1, 0, 2, 8]))
+    array([0, 0, 2, 2])
+    """
+    s1 = encode(s1) if isinstance(s1, str) else s1
+    s2 = encode(s2) if isinstance(s2, str) else s2
+    l2 = len(s2)
+    # pad s1 with zeros (which never match a base) so that any overlap works
+    padded = np.concatenate((np.zeros(l2, dtype=np.uint8), s1,
+                             np.zeros(l2, dtype=np.uint8)))
+    scores = np.empty(len(offsets), dtype=np.int64)
+    step = max(1, CHUNK_CELLS // max(l2, 1))
+    cols = np.arange(l2)
+    for i in range(0, len(offsets), step):
+        rows = offsets[i:i + step, None] + l2 + cols # gather the windows
+        scores[i:i + step] = (padded[rows] == s2).sum(axis=1)
+    return scores
+
+def seeded_search(seq1, seq2, k=K, min_seeds=2, max_candidates=None,
+                  overlap='full', exact_fallback=True):
+    """Like align_seqs_vect.search, but only scoring the offsets that the
+    k-mer index of the longer sequence proposes. Returns the scored offsets,
+    their scores, and the best of them. If no offset has enough seeds, all
+    offsets are scored (exact_fallback=True) or nothing is (False).
+
+    >>> s1 = "TTTTTTTTGATTACAGATTACATTTTTTTTTT"
+    >>> offsets, scores, best = seeded_search(s1, "CCGATTACAGATTACACC", k=5)
+    >>> best.tolist(), int(scores.max())
+    ([6], 14)
+    """
+    if len(seq1) >= len(seq2):
+        s1, s2 = seq1, seq2
+    else:
+        s1, s2 = seq2, seq1
+    offsets = KmerIndex(s1, k).candidate_offsets(s2, min_seeds, max_candidates)
+    if overlap == 'right':
+        offsets = offsets[offsets >= 0]
+    if len(offsets) == 0:
+        if exact_fallback:
+            return search(s1, s2, overlap=overlap)
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    scores = score_offsets(s1, s2, offsets)
+    return offsets, scores, offsets[scores == scores.max()]
+
+def main(argv):
+    """ Main entry point of the program """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('fasta', nargs='*', help='two FASTA files to align')
+    parser.add_argument('-k', type=int, default=K, help='k-mer length')
+    parser.add_argument('--min-seeds', type=int, default=2,
+                        help='seeds needed to score an offset (default: 2)')
+    args = parser.parse_args(argv[1:])
+    if len(args.fasta) == 2:
+        seq1 = next(read_fasta(args.fasta[0]))[1] # the first record of each file
+        seq2 = next(read_fasta(args.fasta[1]))[1]
+    else:
+        seq1 = "ATCGCCGGATTACGGG"
+        seq2 = "CAATTCGGAT"
+
+    start = time.time()
+    offsets, scores, best = seeded_search(seq1, seq2, args.k, args.min_seeds)
+    print("Seeded: scored %d offsets, best score %d at offset(s) %s (%.4f s)" %
+          (len(offsets), scores.max(), best.tolist(), time.time() - start))
+    start = time.time()
+    offsets, scores, best = search(seq1, seq2)
+    print("Exhaustive: scored %d offsets, best score %d at offset(s) %s (%.4f s)" %
+          (len(offsets), scores.max(), best.tolist(), time.time() - start))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+"""Compiled right-hand sides and integrators for the population models.
+
+integrate.odeint calls back into Python for every evaluation of a model's
+right-hand side (dCR_dt, LV... in lv_models.py), and each call builds a new
+numpy array, which is where most of the time goes for long integrations,
+like the t_vec = arange(0, 100., 0.01) of Appendix-Maths. Here the
+right-hand sides are written once in scalar form, writing into an output
+array, and if numba is installed they are compiled (numba.njit) together
+with a fixed step RK4 integrator, so that a whole integration runs in
+machine code without calling back into Python. The compiled right-hand
+sides (and Jacobians) can also be handed to odeint itself.
+
+Without numba, an interpreted RK4 loop would be far slower than odeint
+itself, so integrate falls back to lv_models.odeint (with the analytic
+Jacobian) instead, and the right-hand sides handed to odeint run as plain
+Python. BACKEND says which one is in use.
+(scipy's LowLevelCallable would be the other way to avoid the callbacks,
+but odeint and solve_ivp don't accept one.)
+
+Usage: python3 lv_compiled.py"""
+
+__appname__ = 'lv_compiled'
+__version__ = '0.0.1'
+
+import sys
+import time
+
+import numpy as np
+from scipy import integrate as sc_integrate
+
+import lv_models
+
+try:
+    import numba
+    BACKEND = 'numba'
+except ImportError:
+    numba = None
+    BACKEND = 'numpy'
+
+## functions ##
+
+def _jit(func):
+    """Compile a function with numba if it's available"""
+    return numba.njit(cache=True)(func) if numba is not None else func
+
+# right-hand sides, f(y, t, p, out): p holds the parameters in the order of
+# the lv_models function's arguments
+
+@_jit
+def _exp_pop(y, t, p, out):
+    out[0] = p[0] * y[0]
+
+@_jit
+def _log_pop(y, t, p, out):
+    out[0] = p[0] * y[0] * (1 - y[0] / p[1])
+
+@_jit
+def _LV(y, t, p, out): # p = r_m, K, a, e, z
+    aNC = p[2] * y[0] * y[1]
+    out[0] = p[0] * y[0] * (1 - y[0] / p[1]) - aNC
+    out[1] = p[3] * aNC - p[4] * y[1]
+
+@_jit
+def _dCR_dt(y, t, p, out): # p = r, a, z, e
+    aRC = p[1] * y[0] * y[1]
+    out[0] = p[0] * y[0] - aRC
+    out[1] = -p[2] * y[1] + p[3] * aRC
+
+# Jacobians, J(y, t, p, out) with out[i, j] = d(dy_i/dt)/dy_j
+
+@_jit
+def _exp_pop_jac(y, t, p, out):
+    out[0, 0] = p[0]
+
+@_jit
+def _log_pop_jac(y, t, p, out):
+    out[0, 0] = p[0] * (1 - 2 * y[0] / p[1])
+
+@_jit
+def _LV_jac(y, t, p, out):
+    out[0, 0] = p[0] * (1 - 2 * y[0] / p[1]) - p[2] * y[1]
+    out[0, 1] = -p[2] * y[0]
+    out[1, 0] = p[3] * p[2] * y[1]
+    out[1, 1] = p[3] * p[2] * y[0] - p[4]
+
+@_jit
+def _dCR_dt_jac(y, t, p, out):
+    out[0, 0] = p[0] - p[1] * y[1]
+    out[0, 1] = -p[1] * y[0]
+    out[1, 0] = p[3] * p[1] * y[1]
+    out[1, 1] = p[3] * p[1] * y[0] - p[2]
+
+def _make_rk4(rhs):
+    """A fixed step RK4 integrator for one right-hand side (compiled with
+    it, if numba is available)"""
+    def rk4(y0, t, p, substeps):
+        n = y0.shape[0]
+        out = np.empty((t.shape[0], n))
+        y = y0.copy()
+        k1, k2, k3, k4, tmp = (np.empty(n), np.empty(n), np.empty(n),
+                               np.empty(n), np.empty(n))
+        out[0] = y
+        for i in range(t.shape[0] - 1):
+            h = (t[i + 1] - t[i]) / substeps
+            s = t[i]
+            for _ in range(substeps):
+                rhs(y, s, p, k1)
+                for j in range(n):
+                    tmp[j] = y[j] + h / 2 * k1[j]
+                rhs(tmp, s + h / 2, p, k2)
+                for j in range(n):
+                    tmp[j] = y[j] + h / 2 * k2[j]
+                rhs(tmp, s + h / 2, p, k3)
+                for j in range(n):
+                    tmp[j] = y[j] + h * k3[j]
+                rhs(tmp, s + h, p, k4)
+                for j in range(n):
+                    y[j] += h / 6 * (k1[j] + 2 * k2[j] + 2 * k3[j] + k4[j])
+                s += h
+            out[i + 1] = y
+        return out
+    return _jit(rk4)
+
+# model: (right-hand side, Jacobian, RK4 integrator)
+KERNELS = {model: (rhs, jac, _make_rk4(rhs)) for model, rhs, jac in (
+    (lv_models.exp_pop, _exp_pop, _exp_pop_jac),
+    (lv_models.log_pop, _log_pop, _log_pop_jac),
+    (lv_models.LV, _LV, _LV_jac),
+    (lv_models.dCR_dt, _dCR_dt, _dCR_dt_jac))}
+
+def _kernels(func):
+    try:
+        return KERNELS[func]
+    except KeyError:
+        raise ValueError("no compiled kernels for %r (use one of %s)" %
+                         (func, ', '.join(f.__name__ for f in KERNELS))) from None
+
+def integrate(func, y0, t, args=(), substeps=1):
+    """Integrate one of the lv_models models (func, e.g. lv_models.LV) with
+    its parameters args, as in odeint, by fixed step RK4 with substeps steps
+    between the times t, in compiled code. Without numba, it is integrated
+    by lv_models.odeint instead (and substeps is ignored). Returns a (time,
+    variables) array, like odeint.
+
+    >>> t = np.linspace(0, 10, 101)
+    >>> N = integrate(lv_models.log_pop, 0.1, t, (1., 10.), substeps=10)
+    >>> exact = 10 * 0.1 * np.exp(t) / (10 + 0.1 * (np.exp(t) - 1))
+    >>> bool(np.allclose(N[:, 0], exact, rtol=1e-6))
+    True
+    """
+    rk4 = _kernels(func)[2]
+    y0 = np.atleast_1d(np.asarray(y0, dtype=np.float64))
+    t = np.asarray(t, dtype=np.float64)
+    if numba is None:
+        return lv_models.odeint(func, y0, t, tuple(np.ravel(args)))
+    p = np.asarray(args, dtype=np.float64).reshape(-1)
+    return rk4(y0, t, p, int(substeps))
+
+def odeint(func, y0, t, args=(), **kwargs):
+    """scipy.integrate.odeint for one of the lv_models models, evaluated by
+    its compiled right-hand side and Jacobian (still called back from
+    odeint, but writing into the same two arrays every time, which odeint
+    copies from, instead of building new ones)"""
+    rhs, jac = _kernels(func)[:2]
+    y0 = np.atleast_1d(np.asarray(y0, dtype=np.float64))
+    p = np.asarray(args, dtype=np.float64).reshape(-1)
+    n = len(y0)
+    dydt = np.empty(n)
+    J = np.zeros((n, n))
+    def f(y, t):
+        rhs(y, t, p, dydt)
+        return dydt
+    def Dfun(y, t):
+        jac(y, t, p, J)
+        return J
+    kwargs.setdefault('Dfun', Dfun)
+    return sc_integrate.odeint(f, y0, t, **kwargs)
+
+def main(argv):
+    """ Main entry point of the program """
+    print("Backend: %s" % BACKEND)
+    t_vec = np.arange(0, 100., 0.01)
+    args = (1., 10., 1., 0.5, 0.5) # r_m, K, a, e, z of Appendix-Maths
+    N0C0 = np.array([1., 1.])
+    integrate(lv_models.LV, N0C0, t_vec[:3], args) # compile (or load) first
+
+    n = 200 # integrations of each kind, e.g. a small parameter sweep
+    start = time.perf_counter()
+    for _ in range(n):
+        ref = sc_integrate.odeint(lv_models.LV, N0C0, t_vec, args)
+    print("odeint, Python LV:         %.4f s for %d integrations" % (time.perf_counter() - start, n))
+    start = time.perf_counter()
+    for _ in range(n):
+        odeint(lv_models.LV, N0C0, t_vec, args)
+    print("odeint, compiled LV:       %.4f s" % (time.perf_counter() - start))
+    start = time.perf_counter()
+    for _ in range(n):
+        NC = integrate(lv_models.LV, N0C0, t_vec, args)
+    print("%-26s %.4f s (max difference from odeint %.1e)" %
+          ('compiled RK4 integration:' if numba is not None else 'integrate (odeint):',
+           time.perf_counter() - start, np.abs(NC - ref).max()))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -0,0 +1,684 @@
+#!/usr/bin/env python3
+
+"""The population models of the course (exponential, logistic and Lotka-
+Volterra consumer-resource growth), and a Lotka-Volterra solver for whole
+batches of parameter sets at once.
+
+The right-hand sides are those of 06-Python_II (dCR_dt) and Appendix-Maths
+(exp_pop, log_pop, LV), with the parameters passed as arguments instead of
+read from globals, to be used with scipy.integrate.odeint as in the
+notebooks.
+
+solve_lv_batch integrates the Lotka-Volterra consumer-resource model with
+logistic resource growth,
+
+    dR/dt = r R (1 - R/K) - a R C
+    dC/dt = e a R C - z C
+
+(K = inf gives dCR_dt) for a whole batch of parameter sets and initial
+conditions in one go: the state is a (batch, 2) array, and every evaluation
+of the right-hand side updates all the members of the batch with a few
+numpy operations, written into preallocated arrays. The result is a (batch,
+time, species) array, so sweeping over thousands of parameter sets costs
+about as much as integrating a handful of them one at a time.
+
+Each model comes with its analytic Jacobian (JACOBIANS), which odeint and
+solve_ivp below pass on to scipy automatically, so that stiff solvers (LSODA
+in its stiff mode, Radau, BDF) don't have to estimate it by finite
+differences, which costs extra right-hand side evaluations every time.
+
+Integrations can also stop early, at terminal events (EVENTS): a population
+going extinct, the system reaching a steady state, or a population blowing
+up. integrate_until reports which event stopped a single integration and
+when, and solve_lv_batch(events=...) drops each member of a batch from the
+integration as soon as it hits one, so sweeps don't keep integrating
+populations that have crashed or settled.
+
+Usage: python3 lv_models.py [batch size]"""
+
+__appname__ = 'lv_models'
+__version__ = '0.0.1'
+
+import sys
+import time
+import warnings
+
+import numpy as np
+from scipy import integrate
+
+## constants ##
+
+# parameters and initial conditions of the 06-Python_II example
+R = 1.    # resource growth rate
+A = 0.1   # consumer search (attack) rate
+Z = 1.5   # consumer mortality rate
+E = 0.75  # consumer production (conversion) efficiency
+RC0 = np.array([10., 5.])
+
+ADAPTIVE_METHODS = ('RK45', 'RK23', 'DOP853', 'Radau', 'BDF', 'LSODA')
+
+# terminal events (see make_events)
+EVENTS = ('extinction', 'steady_state', 'blow_up')
+EXTINCTION = 1e-6 # a population below this is extinct
+STEADY = 1e-4     # every per capita |dy/dt| / y below this is a steady state
+BLOW_UP = 1e6     # a population above this has blown up
+
+MAX_REFINE = 20 # times dense output steps may be split in two
+
+## functions ##
+
+def exp_pop(N, t, r_m):
+    """The right-hand side of the exponential growth ODE"""
+    return r_m * N
+
+def log_pop(N, t, r_m, K):
+    """The right-hand side of the logistic ODE"""
+    return r_m * N * (1 - N / K)
+
+def LV(NC, t, r_m, K, a, e, z):
+    """The right-hand side of the Lotka-Volterra consumer-resource ODE, with
+    logistic resource growth"""
+    return np.array([r_m * NC[0] * (1 - NC[0] / K) - a * NC[0] * NC[1],
+                     e * a * NC[0] * NC[1] - z * NC[1]])
+
+def dCR_dt(pops, t=0, r=R, a=A, z=Z, e=E):
+    """The right-hand side of the Lotka-Volterra consumer-resource ODE
+
+    >>> dCR_dt(RC0).round(6).tolist()
+    [5.0, -3.75]
+    """
+    R, C = pops
+    dRdt = r * R - a * R * C
+    dCdt = -z * C + e * a * R * C
+    return np.array([dRdt, dCdt])
+
+## analytic Jacobians: J[i, j] = d(dy_i/dt)/dy_j, with the same arguments
+## as the right-hand sides (the Dfun of odeint, the jac of solve_ivp) ##
+
+def exp_pop_jac(N, t, r_m):
+    """Jacobian of exp_pop"""
+    return np.array([[r_m]], dtype=np.float64)
+
+def log_pop_jac(N, t, r_m, K):
+    """Jacobian of log_pop"""
+    return np.array([[r_m * (1 - 2 * np.ravel(N)[0] / K)]])
+
+def LV_jac(NC, t, r_m, K, a, e, z):
+    """Jacobian of LV"""
+    return np.array([[r_m * (1 - 2 * NC[0] / K) - a * NC[1], -a * NC[0]],
+                     [e * a * NC[1], e * a * NC[0] - z]])
+
+def dCR_dt_jac(pops, t=0, r=R, a=A, z=Z, e=E):
+    """Jacobian of dCR_dt
+
+    >>> dCR_dt_jac(RC0).round(6).tolist()
+    [[0.5, -1.0], [0.375, -0.75]]
+    """
+    R, C = pops
+    return np.array([[r - a * C, -a * R],
+                     [e * a * C, e * a * R - z]])
+
+JACOBIANS = {exp_pop: exp_pop_jac, log_pop: log_pop_jac, LV: LV_jac,
+             dCR_dt: dCR_dt_jac}
+
+def odeint(func, y0, t, args=(), **kwargs):
+    """scipy.integrate.odeint, with the analytic Jacobian of func passed as
+    Dfun if it is one of the models above (see JACOBIANS)
+
+    >>> t = np.linspace(0, 15, 1000)
+    >>> pops, info = odeint(dCR_dt, RC0, t, full_output=True)
+    >>> bool(np.allclose(pops, integrate.odeint(dCR_dt, RC0, t), atol=1e-5))
+    True
+    """
+    if 'Dfun' not in kwargs and func in JACOBIANS:
+        kwargs['Dfun'] = JACOBIANS[func]
+    return integrate.odeint(func, y0, t, args, **kwargs)
+
+def solve_ivp(func, t_span, y0, args=(), method='LSODA', **kwargs):
+    """scipy.integrate.solve_ivp for a right-hand side with odeint's
+    argument order, func(y, t, *args), with its analytic Jacobian passed as
+    jac if it is one of the models above (used by the implicit methods:
+    Radau, BDF and LSODA)"""
+    def fun(t, y):
+        return func(y, t, *args)
+    if 'jac' not in kwargs and func in JACOBIANS:
+        jac = JACOBIANS[func]
+        kwargs['jac'] = lambda t, y: jac(y, t, *args)
+    if kwargs.get('events') is not None:
+        kwargs['events'] = make_events(func, args, kwargs['events'])
+    return integrate.solve_ivp(fun, t_span, np.atleast_1d(y0), method=method,
+                               **kwargs)
+
+## terminal events ##
+
+def make_events(func, args=(), events=EVENTS):
+    """solve_ivp event functions, event(t, y), for a right-hand side
+    func(y, t, *args): each of events is one of the names in EVENTS, or an
+    event function, passed through as it is. The named ones are terminal:
+    'extinction' when a population falls below EXTINCTION, 'steady_state'
+    when every per capita rate of change, |dy/dt| / y, falls below STEADY,
+    and 'blow_up' when a population rises above BLOW_UP."""
+    def extinction(t, y):
+        return np.min(y) - EXTINCTION
+    def steady_state(t, y):
+        return np.max(np.abs(func(y, t, *args)) / (np.abs(y) + EXTINCTION)) - STEADY
+    def blow_up(t, y):
+        return np.max(np.abs(y)) - BLOW_UP
+    named = {'extinction': (extinction, -1), 'steady_state': (steady_state, -1),
+             'blow_up': (blow_up, 1)}
+    out = []
+    for event in ([events] if isinstance(events, str) or callable(events) else events):
+        if callable(event):
+            out.append(event)
+            continue
+        if event not in named:
+            raise ValueError("unknown event %r (use one of %s)" % (event, ', '.join(EVENTS)))
+        function, direction = named[event]
+        function.terminal = True
+        function.direction = direction
+        out.append(function)
+    return out
+
+def integrate_until(func, y0, t, args=(), events=EVENTS, method='LSODA', **kwargs):
+    """Integrate func(y, t, *args) over the times t, as odeint does, but
+    stop at the first of the terminal events (see make_events). Returns the
+    populations at the times reached, and a dict of those times ('t'), the
+    event that stopped the integration ('event', None if it ran to the end),
+    its time ('t_event') and the number of right-hand side evaluations
+    ('nfev').
+
+    >>> t = np.linspace(0, 100, 1001)
+    >>> pops, info = integrate_until(log_pop, 0.1, t, (1., 10.))
+    >>> info['event'], round(info['t_event'], 1), pops.shape
+    ('steady_state', 13.8, (139, 1))
+    >>> pops, info = integrate_until(LV, [1., 1.], t, (1., 10., 1., 0.5, 6.))
+    >>> info['event'], round(info['t_event'], 1) # the consumer can't persist
+    ('extinction', 3.2)
+    """
+    t = np.asarray(t, dtype=np.float64)
+    events = make_events(func, args, events)
+    sol = solve_ivp(func, (t[0], t[-1]), y0, args, method=method, t_eval=t,
+                    events=events, **kwargs)
+    if sol.status == -1:
+        raise RuntimeError("integration failed: %s" % sol.message)
+    info = {'t': sol.t, 'event': None, 't_event': None, 'nfev': sol.nfev}
+    if sol.status == 1: # stopped by the (earliest) terminal event
+        fired = [(times[0], i) for i, times in enumerate(sol.t_events) if len(times)]
+        info['t_event'], i = min(fired)
+        info['event'] = getattr(events[i], '__name__', i)
+        info['t_event'] = float(info['t_event'])
+    return sol.y.T, info
+
+## dense output ##
+
+class Trajectory:
+    """A solution kept as the solver's own steps, rather than at every
+    point of an output grid: the time, state and derivative at each step,
+    from which the state at any time in between is interpolated (cubic
+    Hermite, matching both values and slopes at the steps) when asked for.
+    solve_dense and solve_lv_batch(dense=True) split the solver's steps
+    where that interpolation isn't accurate enough on its own.
+    Memory grows with the number of steps the solver needed, not with the
+    resolution of the output. A trajectory of a batch (batch=True) returns
+    (batch, time, species) arrays, like solve_lv_batch; otherwise (time,
+    variables), like odeint.
+
+    >>> traj = Trajectory([0., 1.], [[0.], [1.]], [[0.], [3.]]) # y = t^3
+    >>> traj([0.5, 1.]).ravel().tolist()
+    [0.125, 1.0]
+    """
+
+    def __init__(self, t, y, dydt, batch=False):
+        self.t = np.asarray(t, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64).reshape(len(self.t), -1)
+        self.dydt = np.asarray(dydt, dtype=np.float64).reshape(self.y.shape)
+        self.batch = batch
+
+    def __repr__(self):
+        return "Trajectory(%d steps over [%g, %g], %d variables, %d bytes)" % (
+            len(self.t), self.t[0], self.t[-1], self.y.shape[1], self.nbytes)
+
+    @property
+    def nbytes(self):
+        return self.t.nbytes + self.y.nbytes + self.dydt.nbytes
+
+    def __call__(self, t):
+        """The states at the times t (within the integrated span)"""
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        if t.size and (t.min() < self.t[0] or t.max() > self.t[-1]):
+            raise ValueError("times outside the integrated span [%g, %g]" %
+                             (self.t[0], self.t[-1]))
+        i = np.clip(np.searchsorted(self.t, t, side='right') - 1, 0, len(self.t) - 2)
+        h = (self.t[i + 1] - self.t[i])[:, None]
+        s = (t - self.t[i])[:, None] / h
+        y0, y1 = self.y[i], self.y[i + 1]
+        m0, m1 = self.dydt[i] * h, self.dydt[i + 1] * h
+        s2, s3 = s * s, s * s * s
+        y = ((2 * s3 - 3 * s2 + 1) * y0 + (s3 - 2 * s2 + s) * m0 +
+             (-2 * s3 + 3 * s2) * y1 + (s3 - s2) * m1)
+        if self.batch:
+            return y.reshape(len(t), -1, 2).transpose(1, 0, 2)
+        return y
+
+def _dense_trajectory(sol, derivative, rtol, atol, batch=False):
+    """A Trajectory of a solve_ivp solution (with dense_output): starting
+    from the solver's steps, every step whose Hermite interpolation at its
+    midpoint is further from the solver's own interpolant than the solver's
+    tolerances (relative to each variable's largest value) is split there,
+    until none is, or with a RuntimeWarning after MAX_REFINE rounds of
+    splitting. derivative(t, y) gives dy/dt at an array of times and a
+    (times, variables) array of states."""
+    t, y = sol.t, sol.y.T
+    dydt = derivative(t, y)
+    scale = atol + rtol * np.abs(y).max(axis=0) # of each variable
+    for refinements in range(MAX_REFINE + 1):
+        mid = (t[:-1] + t[1:]) / 2
+        exact = sol.sol(mid).T
+        error = np.abs(Trajectory(t, y, dydt)(mid) - exact)
+        bad = (error > scale).any(axis=1)
+        if not bad.any():
+            break
+        if refinements == MAX_REFINE:
+            i = np.flatnonzero(bad)[0]
+            warnings.warn("dense output refinement stopped after %d rounds with "
+                          "%d steps outside the tolerances, the first from "
+                          "t=%g to t=%g" % (MAX_REFINE, bad.sum(), t[i], t[i + 1]),
+                          RuntimeWarning, stacklevel=3)
+            break
+        order = np.argsort(np.concatenate((t, mid[bad])), kind='stable')
+        t = np.concatenate((t, mid[bad]))[order]
+        y = np.concatenate((y, exact[bad]))[order]
+        dydt = np.concatenate((dydt, derivative(mid[bad], exact[bad])))[order]
+    return Trajectory(t, y, dydt, batch)
+
+def solve_dense(func, t_span, y0, args=(), method='LSODA', rtol=1e-6,
+                atol=1e-9, **kwargs):
+    """Integrate func(y, t, *args) over t_span with solve_ivp, keeping only
+    the solver's steps (split where needed to interpolate them to within
+    the tolerances; see Trajectory) to be resampled at any times later.
+    Terminal events, if given, end it early.
+
+    >>> traj = solve_dense(log_pop, (0, 100), 0.1, (1., 10.))
+    >>> t = np.linspace(0, 100, 10001)
+    >>> exact = 10 * 0.1 * np.exp(t) / (10 + 0.1 * (np.exp(t) - 1))
+    >>> bool(np.allclose(traj(t)[:, 0], exact, rtol=1e-5)), len(traj.t) < 1000
+    (True, True)
+    """
+    def derivative(t, y):
+        try: # all the times at once, if func works on arrays of states
+            return np.asarray(func(y.T, t, *args), dtype=np.float64).reshape(y.T.shape).T
+        except (ValueError, TypeError):
+            return np.array([func(yi, ti, *args) for yi, ti in zip(y, t)]).reshape(y.shape)
+    sol = solve_ivp(func, t_span, y0, args, method=method, rtol=rtol,
+                    atol=atol, dense_output=True, **kwargs)
+    if sol.status == -1:
+        raise RuntimeError("integration failed: %s" % sol.message)
+    return _dense_trajectory(sol, derivative, rtol, atol)
+
+def lv_params(r=R, a=A, z=Z, e=E, K=np.inf, y0=RC0):
+    """Broadcast parameters (scalars or arrays) and initial conditions
+    (one (R, C) pair, or one per member) to a common batch size. Returns a
+    dict of (batch,) parameter arrays and the (batch, 2) initial states."""
+    r, a, z, e, K = (np.asarray(x, dtype=np.float64) for x in (r, a, z, e, K))
+    y0 = np.asarray(y0, dtype=np.float64)
+    batch = np.broadcast_shapes(r.shape, a.shape, z.shape, e.shape, K.shape,
+                                y0.shape[:-1])
+    if len(batch) > 1:
+        raise ValueError("parameters must be scalars or 1d arrays")
+    n = batch[0] if batch else 1
+    params = {name: np.broadcast_to(x, (n,)).copy()
+              for name, x in (('r', r), ('a', a), ('z', z), ('e', e), ('K', K))}
+    return params, np.broadcast_to(y0, (n, 2)).copy()
+
+def lv_batch_rhs(y, params, out=None):
+    """dy/dt of a (batch, 2) array of (R, C) states, for a dict of (batch,)
+    parameter arrays (see lv_params), written into out if given
+
+    >>> params, y0 = lv_params(r=[1., 2.])
+    >>> lv_batch_rhs(y0, params).tolist()
+    [[5.0, -3.75], [15.0, -3.75]]
+    """
+    if out is None:
+        out = np.empty_like(y)
+    R, C = y[:, 0], y[:, 1]
+    aRC = params['a'] * R * C
+    np.multiply(params['r'] * R, 1 - R / params['K'], out=out[:, 0])
+    out[:, 0] -= aRC
+    np.multiply(params['e'], aRC, out=out[:, 1])
+    out[:, 1] -= params['z'] * C
+    return out
+
+def lv_batch_jac(y, params):
+    """Jacobian of lv_batch_rhs, as a (batch, 2, 2) array of the (R, C)
+    blocks of every member (the members don't interact)"""
+    R, C = y[:, 0], y[:, 1]
+    a = params['a']
+    J = np.empty((len(y), 2, 2))
+    J[:, 0, 0] = params['r'] * (1 - 2 * R / params['K']) - a * C
+    J[:, 0, 1] = -a * R
+    J[:, 1, 0] = params['e'] * a * C
+    J[:, 1, 1] = params['e'] * a * R - params['z']
+    return J
+
+def _batch_jac(params, n, method):
+    """The Jacobian of the flattened batch ([R_0, C_0, R_1, C_1, ...]) in the
+    form a solve_ivp method wants: block diagonal sparse for Radau and BDF,
+    and packed banded (one diagonal either side) for LSODA"""
+    from scipy import sparse
+    if method == 'LSODA':
+        def jac(_, flat):
+            J = lv_batch_jac(flat.reshape(n, 2), params)
+            banded = np.zeros((3, 2 * n)) # rows: upper, main, lower diagonals
+            banded[0, 1::2] = J[:, 0, 1]
+            banded[1, 0::2] = J[:, 0, 0]
+            banded[1, 1::2] = J[:, 1, 1]
+            banded[2, 0::2] = J[:, 1, 0]
+            return banded
+        return jac, {'lband': 1, 'uband': 1}
+    def jac(_, flat):
+        J = lv_batch_jac(flat.reshape(n, 2), params)
+        return sparse.block_diag(J, format='csc')
+    return jac, {}
+
+def _event_names(events):
+    events = [events] if isinstance(events, str) else list(events)
+    for event in events:
+        if event not in EVENTS:
+            raise ValueError("unknown event %r (use one of %s)" % (event, ', '.join(EVENTS)))
+    return events
+
+def _any_species(cond):
+    """cond(y[:, j]) for any species j of a (members, species) array, one
+    column at a time (much faster than .any(axis=1) over a short axis)"""
+    def test(y):
+        now = cond(y[:, 0])
+        for j in range(1, y.shape[1]):
+            now |= cond(y[:, j])
+        return now
+    return test
+
+_extinct = _any_species(lambda x: x < EXTINCTION)
+_blown_up = _any_species(lambda x: ~np.isfinite(x) | (np.abs(x) > BLOW_UP))
+_unsteady = _any_species(lambda x: ~(x < STEADY))
+
+def _batch_events(events, f):
+    """stop(y, members) for _rk4: the index in events of the first event
+    (of EVENTS, as in make_events) each running member has hit, or -1"""
+    events = _event_names(events)
+    def stop(y, members):
+        hit = np.full(len(y), -1)
+        for i, event in reversed(list(enumerate(events))): # the first wins
+            if event == 'extinction':
+                now = _extinct(y)
+            elif event == 'blow_up':
+                now = _blown_up(y)
+            else:
+                rate = np.abs(f(y, np.empty_like(y), members)) / (np.abs(y) + EXTINCTION)
+                now = ~_unsteady(rate)
+            hit[now] = i
+        return hit
+    return stop
+
+def _rk4(f, y0, t, substeps, stop=None):
+    """Fixed step RK4 on a batch, with substeps steps between the times t,
+    reusing the same stage arrays for every step. f(y, out, members) writes
+    dy/dt of the running members (an index array into the batch, or None for
+    all of them) into out. If given, stop(y, members) is called at every
+    time, and returns the index (>= 0) of the event each running member has
+    hit, or -1: members that hit one are dropped from the integration and
+    keep their state for the rest of the times. The states of the whole
+    batch (the stopped members' frozen) are copied into a (time, batch, ...)
+    array at each time, as one contiguous block: writing only the running
+    members, scattered along the time axis of a (batch, time, ...) array,
+    costs more than the integration saved. Returns the (batch, time, ...)
+    output (a transposed view of that array), the event index and time
+    index each member stopped at (-1 and len(t) - 1 if it ran to the end)
+    and the number of member evaluations of f."""
+    y = y0.copy()
+    state = y # of the whole batch
+    out = np.empty((len(t),) + y0.shape)
+    out[0] = y
+    event = np.full(len(y0), -1)
+    stopped = np.full(len(y0), len(t) - 1)
+    members = None # all running
+    evaluations = 0
+    k1, k2, k3, k4, tmp = (np.empty_like(y) for _ in range(5))
+    for i in range(len(t)):
+        if i > 0:
+            h = (t[i] - t[i - 1]) / substeps
+            for _ in range(substeps):
+                f(y, k1, members)
+                np.multiply(k1, h / 2, out=tmp); tmp += y
+                f(tmp, k2, members)
+                np.multiply(k2, h / 2, out=tmp); tmp += y
+                f(tmp, k3, members)
+                np.multiply(k3, h, out=tmp); tmp += y
+                f(tmp, k4, members)
+                k2 += k3
+                k2 *= 2
+                k1 += k2
+                k1 += k4
+                k1 *= h / 6
+                y += k1
+            evaluations += 4 * substeps * len(y)
+            if members is not None:
+                state[members] = y
+            out[i] = state
+        if stop is None:
+            continue
+        hit = stop(y, members)
+        done = hit >= 0
+        if done.any():
+            if members is None:
+                members = np.arange(len(y0))
+                state = y.copy()
+            event[members[done]] = hit[done]
+            stopped[members[done]] = i
+            members = members[~done]
+            y = y[~done]
+            if not len(members):
+                out[i + 1:] = state
+                break
+            k1, k2, k3, k4, tmp = (np.empty_like(y) for _ in range(5))
+    return out.swapaxes(0, 1), event, stopped, evaluations
+
+def solve_lv_batch(t, r=R, a=A, z=Z, e=E, K=np.inf, y0=RC0, method='rk4',
+                   substeps=1, rtol=1e-6, atol=1e-9, jac=True, events=None,
+                   dense=False, full_output=False):
+    """Integrate the Lotka-Volterra model for a batch of parameter sets and
+    initial conditions (scalars or 1d arrays, broadcast together; see
+    lv_params) over the times t, in one solver call. method is 'rk4' (fixed
+    steps, substeps of them between consecutive times) or one of the
+    adaptive methods of scipy.integrate.solve_ivp (ADAPTIVE_METHODS), which
+    then chooses its steps for the whole batch at once (rtol and atol apply
+    to every member; the implicit ones, Radau, BDF and LSODA, are given the
+    analytic, block diagonal Jacobian, unless jac is False). Returns a
+    (batch, time, species) array, and if full_output is True, a dict with the
+    numbers of right-hand side and Jacobian evaluations too ('nfev', 'njev';
+    zero Jacobians for rk4).
+
+    With method 'rk4', events (names from EVENTS) are checked for each
+    member at every time in t, and a member that hits one stops there: its
+    populations stay at their values at that time for the rest of the
+    output, and it is no longer integrated. full_output then also gives each
+    member's 'event' ('' if none) and 't_event' (nan if none), and
+    'member_nfev', the number of right-hand side evaluations summed over the
+    members actually integrated.
+
+    With an adaptive method and dense=True, only t[0] and t[-1] are used,
+    and a Trajectory of the solver's steps is returned instead of the
+    populations: calling it with any times gives the (batch, time, species)
+    populations at those times, without integrating again.
+
+    >>> t = np.linspace(0, 15, 1000)
+    >>> pops = solve_lv_batch(t, r=[1., 1.5], y0=[[10., 5.], [5., 5.]])
+    >>> pops.shape
+    (2, 1000, 2)
+    >>> ref = integrate.odeint(dCR_dt, RC0, t)
+    >>> bool(np.allclose(pops[0], ref, rtol=1e-4, atol=1e-4))
+    True
+    >>> pops, info = solve_lv_batch(np.linspace(0, 100, 1001), r=1., a=1.,
+    ...     z=[0.5, 6.], e=0.5, K=10., y0=[1., 1.], events=EVENTS, full_output=True)
+    >>> info['event'].tolist(), np.round(info['t_event'], 1).tolist()
+    (['', 'extinction'], [nan, 3.3])
+    """
+    params, y = lv_params(r, a, z, e, K, y0)
+    t = np.asarray(t, dtype=np.float64)
+    if method == 'rk4':
+        running = [None, params] # the running members, and their parameters
+        def f(y, out, members):
+            if members is not running[0]:
+                running[:] = members, {k: v[members] for k, v in params.items()}
+            return lv_batch_rhs(y, running[1], out)
+        stop = _batch_events(events, f) if events is not None else None
+        pops, event, stopped, evaluations = _rk4(f, y, t, substeps, stop)
+        if full_output:
+            info = {'nfev': 4 * substeps * int(stopped.max()),
+                    'njev': 0, 'member_nfev': evaluations}
+            if events is not None:
+                names = np.array([''] + [str(x) for x in _event_names(events)], dtype=object)
+                info['event'] = names[event + 1]
+                info['t_event'] = np.where(event >= 0, t[stopped], np.nan)
+            return pops, info
+        return pops
+    if events is not None:
+        raise ValueError("events are only supported by the 'rk4' method in "
+                         "batches (use integrate_until for one system)")
+    if dense and method not in ADAPTIVE_METHODS:
+        raise ValueError("dense output needs one of the adaptive methods (%s)" %
+                         ', '.join(ADAPTIVE_METHODS))
+    if method not in ADAPTIVE_METHODS:
+        raise ValueError("unknown method %r (use 'rk4' or one of %s)" %
+                         (method, ', '.join(ADAPTIVE_METHODS)))
+    n = len(y)
+    calls = [0] # all the evaluations, finite difference Jacobians included
+    def fun(_, flat):
+        calls[0] += 1
+        return lv_batch_rhs(flat.reshape(n, 2), params).ravel()
+    extra = {}
+    if jac and method in ('Radau', 'BDF', 'LSODA'): # the implicit methods
+        extra['jac'], bands = _batch_jac(params, n, method)
+        extra.update(bands)
+    sol = integrate.solve_ivp(fun, (t[0], t[-1]), y.ravel(), method=method,
+                              t_eval=None if dense else t, dense_output=dense,
+                              rtol=rtol, atol=atol, **extra)
+    if not sol.success:
+        raise RuntimeError("integration failed: %s" % sol.message)
+    if dense:
+        def derivative(times, states): # every member at every time
+            tiled = {k: np.tile(v, len(times)) for k, v in params.items()}
+            return lv_batch_rhs(states.reshape(-1, 2), tiled).reshape(states.shape)
+        pops = _dense_trajectory(sol, derivative, rtol, atol, batch=True)
+    else:
+        pops = sol.y.reshape(n, 2, len(t)).transpose(0, 2, 1)
+    if full_output:
+        return pops, {'nfev': calls[0], 'njev': sol.njev}
+    return pops
+
+def jacobian_benchmark():
+    """Integrate each model with odeint with and without its analytic
+    Jacobian, on stiff parameters (fast growth or decay; for LV, fast
+    resource turnover with a large K) where LSODA switches to its stiff
+    (BDF) mode, and print and return the number of right-hand side (nfe)
+    and Jacobian (nje) evaluations, the method LSODA ended in (1: Adams,
+    2: BDF) and the time each took, as {model name: ((nfe, nje, method, s)
+    without, (nfe, nje, method, s) with)}. Without Dfun, LSODA estimates
+    every Jacobian with one extra right-hand side evaluation per variable,
+    so for one or two variables the saving is small (e.g. about 1100 of
+    14000 evaluations for LV, with about 600 Jacobians), and it grows with
+    the number of variables: the last row is solve_lv_batch (BDF) on 200
+    stiff systems at once, with and without the analytic Jacobian. (dCR_dt
+    is left out: its neutral cycles never make LSODA switch to BDF.)"""
+    t = np.linspace(0, 100, 10001)
+    cases = [(exp_pop, 1., (-1000.,)),
+             (log_pop, 0.1, (1000., 10.)),
+             (LV, np.array([1., 1.]), (1000., 1000., 1., 0.5, 0.5))]
+    results = {}
+    print("%-8s %23s %23s" % ('', 'without Dfun', 'with Dfun'))
+    print("%-8s %7s %5s %1s %7s  %7s %5s %1s %7s" %
+          ('model', 'nfe', 'nje', 'm', 's', 'nfe', 'nje', 'm', 's'))
+    for func, y0, args in cases:
+        row = []
+        for Dfun in (None, JACOBIANS[func]):
+            start = time.perf_counter()
+            info = integrate.odeint(func, y0, t, args, Dfun=Dfun, full_output=True)[1]
+            row.append((int(info['nfe'][-1]), int(info['nje'][-1]),
+                        int(info['mused'][-1]), time.perf_counter() - start))
+        results[func.__name__] = tuple(row)
+        print("%-8s %7d %5d %1d %7.4f  %7d %5d %1d %7.4f" % ((func.__name__,) + row[0] + row[1]))
+
+    # where it matters most: a batch of 200 stiff LV systems (400 variables)
+    r = np.random.default_rng(1).uniform(50, 150, 200)
+    row = []
+    for jac in (False, True):
+        start = time.perf_counter()
+        info = solve_lv_batch(t[::10], r=r, a=1., z=0.5, e=0.5, K=10., y0=[1., 1.],
+                              method='BDF', jac=jac, full_output=True)[1]
+        row.append((info['nfev'], info['njev'], 2, time.perf_counter() - start))
+    results['batch'] = tuple(row)
+    print("%-8s %7d %5d %1d %7.4f  %7d %5d %1d %7.4f" % (('batch',) + row[0] + row[1]))
+    return results
+
+def main(argv):
+    """ Main entry point of the program """
+    n = int(argv[1]) if len(argv) > 1 else 1000
+    t = np.linspace(0, 15, 1000)
+    rng = np.random.default_rng(1)
+    r = rng.uniform(0.5, 1.5, n)
+    a = rng.uniform(0.05, 0.2, n)
+
+    start = time.time()
+    for i in range(min(n, 100)): # one odeint call per parameter set
+        integrate.odeint(dCR_dt, RC0, t, args=(r[i], a[i]))
+    looped = (time.time() - start) * n / min(n, 100)
+    print("odeint, one parameter set at a time: %.2f s for %d sets%s" %
+          (looped, n, " (extrapolated from 100)" if n > 100 else ""))
+    for method, kwargs in (('rk4', {'substeps': 2}), ('RK45', {}), ('LSODA', {})):
+        start = time.time()
+        pops = solve_lv_batch(t, r=r, a=a, method=method, **kwargs)
+        print("solve_lv_batch(method=%r): %.2f s for %d sets, result %s" %
+              (method, time.time() - start, n, pops.shape))
+
+    # a sweep in which most consumers die out or settle: members stop
+    # being integrated at their first event
+    t_long = np.linspace(0, 100, 2001)
+    z = rng.uniform(0.1, 5, n)
+    K = rng.uniform(1, 50, n)
+    for events in (None, EVENTS):
+        start = time.time()
+        pops, info = solve_lv_batch(t_long, r=1., a=0.1, z=z, e=0.75, K=K,
+                                    substeps=2, events=events, full_output=True)
+        print("solve_lv_batch(events=%r): %.2f s, %d member evaluations" %
+              (events, time.time() - start, info['member_nfev']))
+    print("    stopped by: %s" % ', '.join('%s %d' % (event, (info['event'] == event).sum())
+                                             for event in EVENTS))
+
+    # dense output: the solver's steps, resampled at any resolution
+    traj = solve_lv_batch(t, r=r, a=a, method='RK45', dense=True)
+    for times in (t, np.linspace(t[0], t[-1], 10000)):
+        print("%d sets at %d times: %.1f MB as an array, resampled from %r" %
+              (n, len(times), n * len(times) * 2 * 8 / 2 ** 20, traj))
+
+    print("\nEvaluations by odeint (LSODA) on stiff parameters:")
+    jacobian_benchmark()
+
+    # a bifurcation diagram: the range of consumer densities, once the
+    # transients have died away, against the resource carrying capacity
+    import matplotlib.pyplot as plt
+    K = np.linspace(2, 60, 500)
+    t = np.linspace(0, 200, 4001)
+    pops = solve_lv_batch(t, r=1., a=1., z=0.5, e=0.5, K=K, y0=[1., 1.],
+                          substeps=2)
+    late = pops[:, t > 150, 1]
+    fig = plt.figure()
+    plt.fill_between(K, late.min(axis=1), late.max(axis=1), alpha=0.5)
+    plt.plot(K, late.mean(axis=1), 'k-')
+    plt.xlabel('Resource carrying capacity $K$')
+    plt.ylabel('Consumer density (range after $t$ = 150)')
+    fig.savefig('../results/LV_bifurcation.pdf')
+    print("Bifurcation diagram of %d values of K saved to ../results/LV_bifurcation.pdf" % len(K))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
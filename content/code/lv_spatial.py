@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+"""The Lotka-Volterra consumer-resource model in two-dimensional space.
+
+Resource and consumer densities live on a grid of cells, and both move by
+diffusion,
+
+    dR/dt = D_R lap(R) + r R (1 - R/K) - a R C
+    dC/dt = D_C lap(C) + e a R C - z C
+
+where lap is the 5-point finite difference Laplacian (with periodic or
+no-flux boundaries). The local dynamics are those of lv_models.LV, evaluated
+for every cell at once with a few numpy operations.
+
+Diffusion is stiff (explicit steps would have to be shorter than h^2 / 4D),
+so the time stepper is implicit-explicit (IMEX, semi-implicit Euler): the
+reactions are stepped explicitly, and diffusion implicitly,
+
+    (I - dt D lap) u_n+1 = u_n + dt f(u_n)
+
+which is stable for any step. The linear solve is diagonal in Fourier space
+(FFT for periodic boundaries, DCT for no-flux ones), so each step costs a
+few O(N log N) transforms; method='sparse' instead solves with the sparse
+matrix (I - dt D lap) by conjugate gradients, which works for any sparse
+operator. On a 512 x 512 grid a step takes about 10 ms (spectral) or 60 ms
+(sparse).
+
+Usage: python3 lv_spatial.py [n] [steps]"""
+
+__appname__ = 'lv_spatial'
+__version__ = '0.0.1'
+
+import sys
+import time
+
+import numpy as np
+from scipy import fft, sparse
+from scipy.sparse.linalg import cg
+
+## constants ##
+
+# parameters with a stable equilibrium (R*, C*) = (z / (e a), r (1 - R*/K) / a)
+# = (1, 0.99), approached in slowly damped oscillations, which spread as waves
+R = 1.    # resource growth rate
+A = 1.    # consumer search (attack) rate
+Z = 0.5   # consumer mortality rate
+E = 0.5   # consumer production (conversion) efficiency
+K = 100.  # resource carrying capacity (large, so the oscillations die out slowly)
+D = (1., 1.) # diffusion coefficients of the resource and the consumer
+
+BOUNDARIES = ('periodic', 'neumann')
+METHODS = ('spectral', 'sparse')
+CG_TOL = 1e-10 # relative tolerance of the sparse (conjugate gradient) solves
+
+## functions ##
+
+def laplacian_1d(n, h=1., boundary='periodic'):
+    """The 3-point second difference matrix on n cells of width h"""
+    L = sparse.diags([np.ones(n - 1), -2 * np.ones(n), np.ones(n - 1)],
+                     [-1, 0, 1], format='lil')
+    if boundary == 'periodic':
+        L[0, n - 1] = L[n - 1, 0] = 1
+    else: # no flux: the cells past the edges mirror the edge cells
+        L[0, 0] = L[n - 1, n - 1] = -1
+    return L.tocsr() / h ** 2
+
+def laplacian(shape, h=1., boundary='periodic'):
+    """The 5-point Laplacian on a (ny, nx) grid, as a sparse matrix acting on
+    the grid flattened in C order
+
+    >>> (laplacian((3, 3)) @ np.arange(9.)).reshape(3, 3).tolist()[1]
+    [3.0, 0.0, -3.0]
+    """
+    if boundary not in BOUNDARIES:
+        raise ValueError("boundary must be one of %s, not %r" % (BOUNDARIES, boundary))
+    ny, nx = shape
+    return (sparse.kron(sparse.identity(ny), laplacian_1d(nx, h, boundary)) +
+            sparse.kron(laplacian_1d(ny, h, boundary), sparse.identity(nx))).tocsr()
+
+def _eigenvalues(n, h, boundary):
+    """Eigenvalues of laplacian_1d, in the order of the (r)fft or dct modes"""
+    k = np.arange(n)
+    if boundary == 'periodic':
+        return (2 * np.cos(2 * np.pi * k / n) - 2) / h ** 2
+    return (2 * np.cos(np.pi * k / n) - 2) / h ** 2
+
+def diffusion_solver(shape, coefficient, dt, h=1., boundary='periodic',
+                     method='spectral'):
+    """A function solving (I - dt coefficient lap) u_new = u for u_new on a
+    grid of the given shape: diagonally in Fourier (periodic) or cosine
+    (no-flux) space, or with the sparse matrix by conjugate gradients (the
+    matrix is symmetric positive definite, and close to I unless dt
+    coefficient / h^2 is large, so a few iterations do, starting from u; a
+    sparse LU factorization of it would take tens of seconds at 512 x 512)
+
+    >>> u = np.random.default_rng(0).random((8, 6))
+    >>> a = diffusion_solver(u.shape, 1., 0.5, boundary='neumann')(u)
+    >>> b = diffusion_solver(u.shape, 1., 0.5, boundary='neumann', method='sparse')(u)
+    >>> bool(np.allclose(a, b)), bool(np.isclose(a.sum(), u.sum()))
+    (True, True)
+    """
+    if boundary not in BOUNDARIES:
+        raise ValueError("boundary must be one of %s, not %r" % (BOUNDARIES, boundary))
+    ny, nx = shape
+    if method == 'sparse':
+        M = (sparse.identity(ny * nx, format='csr') -
+             dt * coefficient * laplacian(shape, h, boundary))
+        def solve(u):
+            b = u.ravel()
+            try:
+                x, info = cg(M, b, x0=b, rtol=CG_TOL, atol=0.)
+            except TypeError: # scipy < 1.12
+                x, info = cg(M, b, x0=b, tol=CG_TOL, atol=0.)
+            if info != 0:
+                raise RuntimeError("conjugate gradients did not converge (%d)" % info)
+            return x.reshape(shape)
+        return solve
+    if method != 'spectral':
+        raise ValueError("method must be one of %s, not %r" % (METHODS, method))
+    ly, lx = _eigenvalues(ny, h, boundary), _eigenvalues(nx, h, boundary)
+    if boundary == 'periodic':
+        denominator = 1 - dt * coefficient * (ly[:, None] + lx[None, :nx // 2 + 1])
+        return lambda u: fft.irfft2(fft.rfft2(u) / denominator, s=shape)
+    denominator = 1 - dt * coefficient * (ly[:, None] + lx[None, :])
+    return lambda u: fft.idctn(fft.dctn(u, type=2, norm='ortho') / denominator,
+                               type=2, norm='ortho')
+
+def reactions(Rs, Cs, r=R, a=A, z=Z, e=E, K=K, out=None):
+    """The local LV dynamics (dR/dt, dC/dt) of every cell, as a (2, ny, nx)
+    array"""
+    if out is None:
+        out = np.empty((2,) + Rs.shape)
+    aRC = a * Rs * Cs
+    np.multiply(r * Rs, 1 - Rs / K, out=out[0])
+    out[0] -= aRC
+    np.multiply(e, aRC, out=out[1])
+    out[1] -= z * Cs
+    return out
+
+def initial_state(shape, rng=None, r=R, a=A, z=Z, e=E, K=K, patch=0.1):
+    """The equilibrium everywhere, except for a square patch (patch of the
+    grid's width) in the middle where the consumer starts at random
+    densities, which sets off waves of consumers and resources"""
+    rng = np.random.default_rng(rng)
+    Rstar = z / (e * a)
+    Cstar = r * (1 - Rstar / K) / a
+    state = np.empty((2,) + tuple(shape))
+    state[0] = Rstar
+    state[1] = Cstar
+    ny, nx = shape
+    hy, hx = max(1, int(ny * patch / 2)), max(1, int(nx * patch / 2))
+    middle = (slice(ny // 2 - hy, ny // 2 + hy), slice(nx // 2 - hx, nx // 2 + hx))
+    state[1][middle] = rng.uniform(0, 2 * Cstar, state[1][middle].shape)
+    return state
+
+def frames(state, steps, dt=0.1, every=None, h=1., D=D, r=R, a=A, z=Z, e=E,
+           K=K, boundary='periodic', method='spectral'):
+    """Step a (2, ny, nx) state of resource and consumer densities `steps`
+    times (IMEX, see the module docstring), and generate (step, state) every
+    `every` steps (and at the end). The state is updated in place: copy it
+    to keep it.
+
+    >>> state = np.array([1.5, 0.5]).reshape(2, 1, 1) * np.ones((2, 4, 4))
+    >>> for step, s in frames(state, 10, dt=0.05): pass
+    >>> y = np.array([1.5, 0.5]).reshape(2, 1, 1) # uniform: just the local
+    >>> for _ in range(10):                        # dynamics, by Euler steps
+    ...     y = y + 0.05 * reactions(y[0], y[1])
+    >>> bool(np.allclose(s[:, :1, :1], y)), bool(np.ptp(s[0]) < 1e-12)
+    (True, True)
+    """
+    shape = state.shape[1:]
+    solvers = {}
+    for d in D: # one each, or one for both if they diffuse alike
+        if d not in solvers:
+            solvers[d] = diffusion_solver(shape, d, dt, h, boundary, method)
+    solvers = [solvers[d] for d in D]
+    rates = np.empty_like(state)
+    every = every or steps
+    for step in range(1, steps + 1):
+        reactions(state[0], state[1], r, a, z, e, K, out=rates)
+        rates *= dt
+        rates += state
+        for i, solve in enumerate(solvers):
+            state[i] = solve(rates[i])
+        np.maximum(state, 0, out=state) # densities can't go negative
+        if step % every == 0 or step == steps:
+            yield step, state
+
+def simulate(shape=(256, 256), steps=1000, dt=0.1, rng=None, **kwargs):
+    """Run the spatial model from initial_state for `steps` steps, and
+    return the final (2, ny, nx) state (keyword arguments as for frames)"""
+    state = initial_state(shape, rng)
+    for _, state in frames(state, steps, dt, **kwargs):
+        pass
+    return state
+
+def main(argv):
+    """ Main entry point of the program """
+    n = int(argv[1]) if len(argv) > 1 else 512
+    steps = int(argv[2]) if len(argv) > 2 else 1000
+    dt = 0.1
+    for method in METHODS:
+        state = initial_state((n, n), 1)
+        start = time.time()
+        list(frames(state, 10, dt, method=method))
+        print("%s: %.1f ms per step on a %d x %d grid (incl. setup)" %
+              (method, (time.time() - start) * 100, n, n))
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    start = time.time()
+    state = initial_state((n, n), 1)
+    for _, state in frames(state, steps, dt):
+        pass
+    print("%d steps (t = %g) in %.1f s" % (steps, steps * dt, time.time() - start))
+    for i, name in enumerate(('Resource', 'Consumer')):
+        ax = fig.add_subplot(1, 2, i + 1)
+        image = ax.imshow(state[i], cmap='viridis')
+        ax.set_title('%s density, t = %g' % (name, steps * dt))
+        ax.set_axis_off()
+        fig.colorbar(image, ax=ax, shrink=0.7)
+    fig.savefig('../results/LV_spatial.png')
+    print("Densities saved to ../results/LV_spatial.png")
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+"""Ensembles of the discrete-time, stochastic Lotka-Volterra model.
+
+The discrete-time consumer-resource model of the 06-Python_II practicals
+(LV3.py, LV4.py) is
+
+    R_t+1 = R_t (1 + (r + eps) (1 - R_t/K) - a C_t)
+    C_t+1 = C_t (1 - z + e a R_t)
+
+with eps a gaussian fluctuation in the resource's growth rate, drawn anew
+at every step (or, with noise='both', independent fluctuations added to the
+growth of both populations). Rather than looping over time for one
+trajectory at a time, simulate() steps a whole ensemble of replicate
+trajectories at once: the state is a (replicates, 2) array, every step is a
+few numpy operations on it, and all the fluctuations of a step come from a
+single call to a seeded random Generator, so the only Python loop is over
+time.
+
+Populations that fall to (or below) the extinction threshold are set to
+zero, which is absorbing, and the step at which each went extinct is
+recorded. By default only summaries across the replicates are kept at each
+step (mean, standard deviation, quantiles, fraction extinct), so memory
+doesn't grow with replicates x generations; store=True keeps every
+trajectory as well.
+
+Usage: python3 lv_stochastic.py [replicates] [generations]"""
+
+__appname__ = 'lv_stochastic'
+__version__ = '0.0.1'
+
+import sys
+import time
+
+import numpy as np
+
+## constants ##
+
+# parameters for which the deterministic model has a stable equilibrium
+# (R*, C*) = (z / (e a), r (1 - R*/K) / a) = (6.67, 5.56)
+R = 1.     # resource growth rate
+A = 0.1    # consumer search (attack) rate
+Z = 0.5    # consumer mortality rate (per step, so below 1)
+E = 0.75   # consumer production (conversion) efficiency
+K = 15.    # resource carrying capacity
+RC0 = np.array([10., 5.])
+SIGMA = 0.1 # standard deviation of the fluctuations
+
+EXTINCTION = 1e-6 # populations at or below this are extinct
+QUANTILES = (0.05, 0.5, 0.95)
+NOISE = ('growth', 'both')
+
+## functions ##
+
+def lv_step(RC, r=R, a=A, z=Z, e=E, K=K, eps=0., out=None):
+    """One step of the discrete-time LV model for a (replicates, 2) array
+    of (R, C), with fluctuations eps: a (replicates,) array (or scalar) in
+    the resource growth rate, or a (replicates, 2) array added to the growth
+    of each population. Parameters are scalars or (replicates,) arrays.
+
+    >>> lv_step(np.array([[10., 5.]])).tolist()
+    [[8.333333333333336, 6.25]]
+    """
+    if out is None:
+        out = np.empty_like(RC)
+    Rt, Ct = RC[:, 0], RC[:, 1]
+    eps = np.asarray(eps)
+    if eps.ndim == 2:
+        growth_R = 1 + eps[:, 0] + r * (1 - Rt / K) - a * Ct
+        growth_C = 1 + eps[:, 1] - z + e * a * Rt
+    else:
+        growth_R = 1 + (r + eps) * (1 - Rt / K) - a * Ct
+        growth_C = 1 - z + e * a * Rt
+    np.multiply(Rt, growth_R, out=out[:, 0])
+    np.multiply(Ct, growth_C, out=out[:, 1])
+    return out
+
+def simulate(generations, replicates=1000, r=R, a=A, z=Z, e=E, K=K, RC0=RC0,
+             sigma=SIGMA, noise='growth', seed=None, extinction=EXTINCTION,
+             quantiles=QUANTILES, store=False):
+    """Simulate `replicates` trajectories of the stochastic discrete-time LV
+    model for `generations` steps (see the module docstring), all starting
+    from RC0 (a (2,) or (replicates, 2) array), with fluctuations of
+    standard deviation sigma drawn from a Generator seeded with seed.
+    Parameters are scalars or (replicates,) arrays.
+
+    Returns a dict of
+        mean, std           (generations + 1, 2) across the replicates
+        quantiles           (len(quantiles), generations + 1, 2)
+        extinct             (generations + 1, 2) fraction of replicates
+                            in which each population is extinct
+        extinction_time     (replicates, 2) step each population went
+                            extinct, -1 if it didn't
+        final               (replicates, 2) the last state
+        trajectories        (generations + 1, replicates, 2), if store
+
+    >>> out = simulate(100, replicates=500, sigma=0.1, seed=1)
+    >>> out['mean'].shape, out['final'].shape
+    ((101, 2), (500, 2))
+    >>> out['mean'][-1].round(1).tolist() # around the equilibrium
+    [6.7, 5.5]
+    >>> det = simulate(200, replicates=1, sigma=0., e=0.1) # too inefficient
+    >>> det['extinction_time'].tolist(), det['final'].round(6).tolist()
+    ([[-1, 35]], [[15.0, 0.0]])
+    """
+    if noise not in NOISE:
+        raise ValueError("noise must be one of %s, not %r" % (NOISE, noise))
+    rng = np.random.default_rng(seed)
+    RC = np.array(np.broadcast_to(RC0, (replicates, 2)), dtype=np.float64)
+    params = dict(r=r, a=a, z=z, e=e, K=K)
+    noise_shape = (replicates, 2) if noise == 'both' else (replicates,)
+
+    n = generations + 1
+    summary = {'mean': np.empty((n, 2)), 'std': np.empty((n, 2)),
+               'quantiles': np.empty((len(quantiles), n, 2)),
+               'extinct': np.empty((n, 2))}
+    extinction_time = np.full((replicates, 2), -1)
+    trajectories = np.empty((n, replicates, 2)) if store else None
+    nxt = np.empty_like(RC)
+
+    def record(t):
+        dead = RC <= extinction
+        RC[dead] = 0.
+        extinction_time[dead & (extinction_time < 0)] = t
+        summary['mean'][t] = RC.mean(axis=0)
+        summary['std'][t] = RC.std(axis=0)
+        if len(quantiles):
+            summary['quantiles'][:, t] = np.quantile(RC, quantiles, axis=0)
+        summary['extinct'][t] = dead.mean(axis=0)
+        if store:
+            trajectories[t] = RC
+        return dead.all()
+
+    t = 0
+    all_dead = record(0)
+    while t < generations and not all_dead:
+        t += 1
+        eps = rng.normal(0., sigma, noise_shape) if sigma > 0 else 0.
+        lv_step(RC, eps=eps, out=nxt, **params)
+        RC, nxt = nxt, RC
+        all_dead = record(t)
+    if t < generations: # every population of every replicate is extinct
+        for name in ('mean', 'std', 'extinct'):
+            summary[name][t + 1:] = summary[name][t]
+        summary['quantiles'][:, t + 1:] = summary['quantiles'][:, t:t + 1]
+        if store:
+            trajectories[t + 1:] = 0.
+
+    summary['extinction_time'] = extinction_time
+    summary['final'] = RC
+    if store:
+        summary['trajectories'] = trajectories
+    return summary
+
+def simulate_loop(generations, r=R, a=A, z=Z, e=E, K=K, RC0=RC0, sigma=SIGMA,
+                  seed=None, extinction=EXTINCTION):
+    """One trajectory of the model with resource growth fluctuations, a step
+    at a time, as in LV4.py, for comparison"""
+    rng = np.random.default_rng(seed)
+    Rt, Ct = RC0
+    pops = [(Rt, Ct)]
+    for _ in range(generations):
+        eps = rng.normal(0., sigma)
+        Rt, Ct = (Rt * (1 + (r + eps) * (1 - Rt / K) - a * Ct),
+                  Ct * (1 - z + e * a * Rt))
+        Rt, Ct = (Rt if Rt > extinction else 0.), (Ct if Ct > extinction else 0.)
+        pops.append((Rt, Ct))
+    return np.array(pops)
+
+def main(argv):
+    """ Main entry point of the program """
+    replicates = int(argv[1]) if len(argv) > 1 else 10000
+    generations = int(argv[2]) if len(argv) > 2 else 1000
+
+    start = time.time()
+    for i in range(min(replicates, 100)):
+        simulate_loop(generations, sigma=0.5, seed=i)
+    looped = (time.time() - start) * replicates / min(replicates, 100)
+    print("Loop over time, one trajectory at a time: %.2f s for %d replicates%s" %
+          (looped, replicates, " (extrapolated from 100)" if replicates > 100 else ""))
+
+    for noise in NOISE:
+        start = time.time()
+        out = simulate(generations, replicates, sigma=0.5, noise=noise, seed=1)
+        print("simulate(noise=%r): %.2f s for %d replicates" %
+              (noise, time.time() - start, replicates))
+        dead = out['extinction_time'] >= 0
+        print("    mean (R, C) at the end: (%.2f, %.2f); extinct: resource %.1f%%, "
+              "consumer %.1f%%" % (tuple(out['mean'][-1]) + tuple(100 * dead.mean(axis=0))))
+        if dead[:, 1].any():
+            print("    median consumer extinction time: %d steps" %
+                  np.median(out['extinction_time'][dead[:, 1], 1]))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
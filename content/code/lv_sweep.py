@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+"""Sweep the Lotka-Volterra model over a grid of parameters, and map where
+both species persist.
+
+Instead of hand tuning r, a, z, e and K until both the resource and the
+consumer persist (the LV2.py practical of 06-Python_II), sweep() evaluates
+the model (lv_models.solve_lv_batch, with logistic resource growth) at
+every point of a grid of parameter values, and records the final state,
+the range of each population over the last part of the run, and whether
+both stayed above a threshold throughout it. The grid is split into chunks,
+each integrated as one batch, and the chunks are spread across processes
+(parallel.parallel_map).
+
+Results are memoized on disk: there is one cache file per set of solver
+settings (run length, method, initial state...), holding the metrics of
+every parameter point evaluated with them so far, so re-running a sweep,
+or a finer grid that includes the points of a coarser one, only integrates
+the new points. persistence_map() draws the fraction of points at which
+both species persist over two of the parameters.
+
+Usage: python3 lv_sweep.py [n] [processes]"""
+
+__appname__ = 'lv_sweep'
+__version__ = '0.0.1'
+
+import hashlib
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+import lv_models
+from parallel import parallel_map
+
+## constants ##
+
+PARAMS = ('r', 'a', 'z', 'e', 'K')
+METRICS = ('R_final', 'C_final', 'R_min', 'C_min', 'R_max', 'C_max', 'persists')
+
+# default solver settings; all of them are part of the cache key
+SETTINGS = {'t_end': 200., 'times': 2001, 'method': 'rk4', 'substeps': 2,
+            'y0': (10., 5.), # lv_models.RC0
+            'late': 0.25,    # fraction of the run the metrics are taken over
+            'threshold': 1e-3}
+
+CHUNK_POINTS = 500 # parameter points integrated as one batch
+CACHE_DIR = '../results/lv_sweep_cache'
+DIGITS = 12 # significant digits of parameter values in cache keys
+
+## functions ##
+
+def grid(r=lv_models.R, a=lv_models.A, z=lv_models.Z, e=lv_models.E, K=np.inf):
+    """All the combinations of parameter values (scalars or sequences), as
+    an (points, 5) array with columns PARAMS
+
+    >>> grid(r=[1., 2.], K=[10., 20.])[:, [0, 4]].tolist()
+    [[1.0, 10.0], [1.0, 20.0], [2.0, 10.0], [2.0, 20.0]]
+    """
+    values = [np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in (r, a, z, e, K)]
+    return np.array(list(itertools.product(*values)), dtype=np.float64).reshape(-1, len(PARAMS))
+
+def _point_key(point):
+    """Hashable key of a parameter point, rounded so that the same values
+    computed in different ways (e.g. by linspace on finer grids) agree"""
+    return tuple(float('%.*g' % (DIGITS, x)) for x in point)
+
+def _cache_file(cache_dir, settings):
+    digest = hashlib.sha1(repr(sorted(settings.items())).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, 'lv_sweep_%s.npz' % digest)
+
+def _load_cache(filename):
+    """The cached {point key: metrics} of a cache file (empty if none)"""
+    if not os.path.exists(filename):
+        return {}
+    with np.load(filename) as data:
+        return {_point_key(p): m for p, m in zip(data['points'], data['metrics'])}
+
+def _save_cache(filename, cache):
+    """Write the whole cache, atomically (to a temporary file, then renamed),
+    so an interrupted write never leaves a broken cache behind"""
+    os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+    points = np.array(list(cache.keys()), dtype=np.float64).reshape(-1, len(PARAMS))
+    metrics = np.array(list(cache.values()), dtype=np.float64).reshape(-1, len(METRICS))
+    tmp = filename + '.tmp.npz'
+    np.savez(tmp, points=points, metrics=metrics)
+    os.replace(tmp, filename)
+
+def _evaluate_chunk(points, t_end, times, method, substeps, y0, late, threshold):
+    """Integrate one chunk of parameter points as a batch, and return their
+    (points, len(METRICS)) metrics"""
+    t = np.linspace(0, t_end, times)
+    r, a, z, e, K = points.T
+    with np.errstate(all='ignore'): # diverging runs just give inf/nan
+        pops = lv_models.solve_lv_batch(t, r=r, a=a, z=z, e=e, K=K, y0=y0,
+                                        method=method, substeps=substeps)
+    end = pops[:, t >= (1 - late) * t_end]
+    finite = np.isfinite(end).all(axis=(1, 2))
+    lo, hi = end.min(axis=1), end.max(axis=1)
+    persists = finite & (lo > threshold).all(axis=1)
+    return np.column_stack((end[:, -1], lo, hi, persists)).astype(np.float64)
+
+def sweep(points, processes=None, chunk=CHUNK_POINTS, cache_dir=CACHE_DIR,
+          **settings):
+    """The metrics (METRICS) of the LV model at every parameter point (an
+    (points, 5) array with columns PARAMS, see grid()), with the solver
+    settings of SETTINGS, overridden by keyword. Only points not in the disk
+    cache for these settings (in cache_dir; None for no cache) are
+    integrated, in chunks of `chunk` points spread across `processes`
+    processes. Returns a dict of columns: the parameters, the metrics, and
+    'cached' (whether each point came from the cache).
+
+    >>> out = sweep(grid(z=[0.5, 2.], e=0.5, a=1., K=2.), processes=1, cache_dir=None)
+    >>> out['persists'].tolist() # the consumer needs z < e a K
+    [True, False]
+    """
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise ValueError("unknown solver settings: %s" % ', '.join(sorted(unknown)))
+    settings = dict(SETTINGS, **settings)
+    settings['y0'] = tuple(float(x) for x in settings['y0'])
+    points = np.asarray(points, dtype=np.float64).reshape(-1, len(PARAMS))
+    keys = [_point_key(p) for p in points]
+
+    filename = _cache_file(cache_dir, settings) if cache_dir is not None else None
+    cache = _load_cache(filename) if filename else {}
+    cached = np.array([k in cache for k in keys], dtype=bool)
+    new = {} # key: point, of the points to integrate (once each)
+    for k, p, c in zip(keys, points, cached):
+        if not c:
+            new.setdefault(k, p)
+    if new:
+        todo = np.array(list(new.values()))
+        chunks = [todo[i:i + chunk] for i in range(0, len(todo), chunk)]
+        results = parallel_map(_evaluate_chunk, chunks, processes=processes,
+                               chunksize=1, **settings)
+        cache.update(zip(new, np.concatenate(results)))
+        if filename:
+            _save_cache(filename, cache)
+
+    metrics = np.array([cache[k] for k in keys]).reshape(-1, len(METRICS))
+    out = {name: points[:, i] for i, name in enumerate(PARAMS)}
+    out.update((name, metrics[:, i]) for i, name in enumerate(METRICS))
+    out['persists'] = out['persists'].astype(bool)
+    out['cached'] = cached
+    return out
+
+def persistence_map(results, x='K', y='z', filename='../results/LV_persistence.pdf',
+                    metric='persists'):
+    """Draw the mean of a metric (by default, the fraction of points at which
+    both species persist) over the other parameters, for every pair of
+    values of the parameters x and y of a sweep, as a heat map saved to
+    filename. Returns the (y values, x values) array of means."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    xs, xi = np.unique(results[x], return_inverse=True)
+    ys, yi = np.unique(results[y], return_inverse=True)
+    cell = yi.ravel() * len(xs) + xi.ravel()
+    total = np.bincount(cell, results[metric].astype(np.float64), minlength=len(xs) * len(ys))
+    count = np.bincount(cell, minlength=len(xs) * len(ys))
+    with np.errstate(invalid='ignore'):
+        means = (total / count).reshape(len(ys), len(xs))
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    mesh = ax.pcolormesh(xs, ys, means, shading='nearest', cmap='viridis',
+                         vmin=0, vmax=1 if metric == 'persists' else None)
+    fig.colorbar(mesh, ax=ax, label='fraction persisting' if metric == 'persists' else metric)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    fig.savefig(filename)
+    return means
+
+def main(argv):
+    """ Main entry point of the program """
+    n = int(argv[1]) if len(argv) > 1 else 41
+    processes = int(argv[2]) if len(argv) > 2 else None
+    r = [0.5, 1., 2.]
+    K = np.linspace(1, 50, n)
+    z = np.linspace(0.1, 5, n)
+
+    # a coarse grid first, then a finer one that contains it: only the new
+    # points of the finer grid are integrated
+    for Ks, zs in ((K[::2], z[::2]), (K, z)):
+        points = grid(r=r, a=0.1, z=zs, e=0.75, K=Ks)
+        start = time.time()
+        out = sweep(points, processes)
+        print("%d points (%d integrated, %d from the cache) in %.2f s; both persist at %.0f%%" %
+              (len(points), (~out['cached']).sum(), out['cached'].sum(),
+               time.time() - start, 100 * out['persists'].mean()))
+    persistence_map(out, 'K', 'z')
+    print("Persistence map over K and z saved to ../results/LV_persistence.pdf")
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
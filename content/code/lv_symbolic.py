@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+"""Compile population models written with sympy into numpy functions.
+
+Appendix-Maths works models out with sympy, and then types them in again by
+hand as numpy functions for odeint (exp_pop, log_pop and LV in lv_models.py).
+SymbolicModel does the second step: given the state variables, parameters
+and sympy expressions of dy/dt, it derives the Jacobian symbolically, and
+generates numpy functions for both with sympy.lambdify, with common
+subexpressions computed only once (cse=True). The functions take odeint's
+arguments, rhs(y, t, *params) and jac(y, t, *params), evaluate arrays of
+states in one call too (y[i] an array for each variable), and plug straight
+into odeint and solve_ivp (the model's own odeint and solve_ivp methods pass
+the Jacobian along).
+
+Deriving and generating code for a big system takes a while, so the
+generated source is cached on disk (in __pycache__), in a file named after a
+hash of the expressions: running the same model again just loads it.
+
+Usage: python3 lv_symbolic.py"""
+
+__appname__ = 'lv_symbolic'
+__version__ = '0.0.1'
+
+import functools
+import hashlib
+import inspect
+import os
+import sys
+import time
+
+import numpy as np
+import sympy as sp
+
+import lv_models
+
+## constants ##
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         '__pycache__', 'lv_symbolic')
+
+## functions ##
+
+@functools.lru_cache(maxsize=None)
+def _namespace():
+    """The names that numpy code generated by lambdify refers to"""
+    return sp.lambdify([], 0, 'numpy').__globals__
+
+def _generate(name, args, exprs, cse):
+    """Source code of a numpy function `name`(*args) returning exprs"""
+    func = sp.lambdify(args, exprs, 'numpy', cse=cse)
+    return inspect.getsource(func).replace('def _lambdifygenerated(', 'def %s(' % name, 1)
+
+def _as_array(values):
+    """The (nested) list returned by a generated function as a float array,
+    broadcasting constants against arrays of states if there are any"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except ValueError: # some entries are arrays, others constants
+        nested = isinstance(values[0], list)
+        flat = [v for row in values for v in row] if nested else values
+        flat = np.broadcast_arrays(*flat)
+        shape = (len(values), len(values[0])) if nested else (len(values),)
+        return np.array(flat, dtype=np.float64).reshape(shape + flat[0].shape)
+
+def _returning_array(func, name):
+    """func, with its result converted to a float array by _as_array"""
+    @functools.wraps(func)
+    def wrapper(*args):
+        return _as_array(func(*args))
+    wrapper.__qualname__ = wrapper.__name__ = name
+    return wrapper
+
+class SymbolicModel:
+    """An ODE model, dy/dt = rhs(y, t, *params), from sympy expressions:
+    states and params are sequences of sympy symbols (or their names), and
+    rhs the sympy expressions of the derivatives of the states, in the same
+    order. t is the symbol for time, if the expressions use it.
+
+    >>> N, r_m, K = sp.symbols('N r_m K')
+    >>> model = SymbolicModel('log_pop', [N], [r_m * N * (1 - N / K)], [r_m, K])
+    >>> model.rhs([5.], 0., 1., 10.), model.jac([5.], 0., 1., 10.)
+    (array([2.5]), array([[0.]]))
+    >>> model.rhs([np.array([1., 5.])], 0., 1., 10.)[0].tolist() # vectorized
+    [0.9, 2.5]
+    """
+
+    def __init__(self, name, states, rhs, params=(), t='t', cse=True,
+                 cache_dir=CACHE_DIR):
+        self.name = name
+        self.states = [sp.Symbol(s) if isinstance(s, str) else s for s in states]
+        self.params = [sp.Symbol(p) if isinstance(p, str) else p for p in params]
+        self.t = sp.Symbol(t) if isinstance(t, str) else t
+        self.exprs = [sp.sympify(e) for e in rhs]
+        if len(self.exprs) != len(self.states):
+            raise ValueError("%d expressions for %d states" % (len(self.exprs), len(self.states)))
+        key = sp.srepr((self.states, self.t, self.params, self.exprs, cse))
+        self.key = hashlib.sha1((sp.__version__ + key).encode()).hexdigest()[:16]
+        self.source = self._load(cache_dir, cse)
+        namespace = dict(_namespace())
+        filename = self.cache_file(cache_dir) if cache_dir else '<%s>' % name
+        exec(compile(self.source, filename, 'exec'), namespace)
+        self.rhs = _returning_array(namespace['rhs'], name)
+        self.jac = _returning_array(namespace['jac'], name + '_jac')
+
+    def __repr__(self):
+        return "SymbolicModel(%r: d(%s)/dt = %s)" % (
+            self.name, ', '.join(map(str, self.states)), self.exprs)
+
+    def cache_file(self, cache_dir=CACHE_DIR):
+        return os.path.join(cache_dir, '%s_%s.py' % (self.name, self.key))
+
+    def _load(self, cache_dir, cse):
+        """The generated source of rhs and jac, from the cache if it's there,
+        or else generated (and cached)"""
+        filename = self.cache_file(cache_dir) if cache_dir else None
+        if filename and os.path.exists(filename):
+            with open(filename) as f:
+                return f.read()
+        args = [self.states, self.t] + self.params
+        jacobian = sp.Matrix(self.exprs).jacobian(self.states)
+        source = ('# generated by lv_symbolic.py for %s; do not edit\n\n' % self.name +
+                  _generate('rhs', args, self.exprs, cse) + '\n' +
+                  _generate('jac', args, jacobian.tolist(), cse))
+        if filename:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = '%s.%d.tmp' % (filename, os.getpid())
+            with open(tmp, 'w') as f:
+                f.write(source)
+            os.replace(tmp, filename) # atomically, in case of parallel runs
+        return source
+
+    def evaluate(self, y, t=0., *params):
+        """rhs as an (states, ...) array, broadcasting the derivatives (some
+        may be constants) against each other"""
+        return self.rhs(y, t, *params)
+
+    def odeint(self, y0, t, args=(), **kwargs):
+        """scipy.integrate.odeint of the model, with its Jacobian"""
+        kwargs.setdefault('Dfun', self.jac)
+        return lv_models.odeint(self.rhs, y0, t, args, **kwargs)
+
+    def solve_ivp(self, t_span, y0, args=(), method='LSODA', **kwargs):
+        """scipy.integrate.solve_ivp of the model, with its Jacobian"""
+        if 'jac' not in kwargs:
+            kwargs['jac'] = lambda t, y: self.jac(y, t, *args)
+        return lv_models.solve_ivp(self.rhs, t_span, y0, args, method, **kwargs)
+
+def appendix_models(**kwargs):
+    """The models of Appendix-Maths (those of lv_models.py), derived from
+    their sympy expressions: a dict of name: SymbolicModel"""
+    N, C, r_m, K, a, e, z = sp.symbols('N C r_m K a e z')
+    return {'exp_pop': SymbolicModel('exp_pop', [N], [r_m * N], [r_m], **kwargs),
+            'log_pop': SymbolicModel('log_pop', [N], [r_m * N * (1 - N / K)],
+                                     [r_m, K], **kwargs),
+            'LV': SymbolicModel('LV', [N, C],
+                                [r_m * N * (1 - N / K) - a * N * C, e * a * N * C - z * C],
+                                [r_m, K, a, e, z], **kwargs)}
+
+def glv_model(S, **kwargs):
+    """Generalised Lotka-Volterra dynamics of S species, dN_i/dt = N_i (r_i +
+    sum_j A_ij N_j), with every r_i and A_ij a parameter (S + S^2 of them,
+    r_0..., then A_0_0, A_0_1...): a system big enough for the derivation
+    and code generation to take a noticeable time"""
+    N = sp.symbols('N_:%d' % S)
+    r = sp.symbols('r_:%d' % S)
+    A = sp.Matrix(S, S, lambda i, j: sp.Symbol('A_%d_%d' % (i, j)))
+    rhs = [N[i] * (r[i] + sum(A[i, j] * N[j] for j in range(S))) for i in range(S)]
+    return SymbolicModel('glv%d' % S, N, rhs, list(r) + list(A), **kwargs)
+
+def main(argv):
+    """ Main entry point of the program """
+    start = time.time()
+    models = appendix_models()
+    print("Models compiled (or loaded from %s) in %.3f s" %
+          (os.path.relpath(CACHE_DIR), time.time() - start))
+    t_vec = np.arange(0, 100., 0.01)
+    args = (1., 10., 1., 0.5, 0.5) # r_m, K, a, e, z of Appendix-Maths
+    N0C0 = np.array([1., 1.])
+    ref = lv_models.odeint(lv_models.LV, N0C0, t_vec, args)
+    for label, solve in (('hand-written', functools.partial(lv_models.odeint, lv_models.LV)),
+                         ('symbolic', models['LV'].odeint)):
+        start = time.perf_counter()
+        for _ in range(20):
+            NC = solve(N0C0, t_vec, args)
+        print("odeint, %-12s LV: %.4f s per run (max difference %.1e)" %
+              (label, (time.perf_counter() - start) / 20, np.abs(NC - ref).max()))
+
+    for cache_dir in (None, CACHE_DIR):
+        start = time.time()
+        glv_model(20, cache_dir=cache_dir)
+        print("A 20 species GLV model %s in %.3f s" %
+              ('generated' if cache_dir is None else 'from the cache', time.time() - start))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+"""Fit the growth models of Appendix-NLLS-Python from many random starting
+values at once, in parallel, and pick the best fits.
+
+A non-linear least squares fit can get stuck in a local minimum, or fail
+to converge, depending on where it starts. Rather than fitting each model
+(residuals_linear, residuals_logistic, residuals_gompertz,
+residuals_genlogistic, as in the notebook) once from hand-picked starting
+values, fit_models() draws `starts` random starting points per model, from
+ranges set by the data, and fits from each with lmfit's Minimizer. The fits
+are spread across worker processes (parallel.parallel_map), each with its
+own random stream, so the results don't depend on the number of processes.
+
+Every fit, converged or not, is a row of the result table (a list of dicts,
+with the same keys in every row): the model, the start, whether it
+succeeded (with lmfit's or the error's message if not), its residual sum of
+squares, AIC and BIC, and the fitted values of the parameters (nan for the
+parameters of the other models). best_fits() keeps the best fit of each
+model, by AIC (or RSS), ready to compare the models.
+
+Usage: python3 nlls_fit.py [starts] [processes] [-o ../results/nlls_fits.csv]"""
+
+__appname__ = 'nlls_fit'
+__version__ = '0.0.1'
+
+import argparse
+import csv
+import sys
+import time
+import warnings
+
+import numpy as np
+from lmfit import Minimizer, Parameters
+
+from parallel import parallel_map
+
+## constants ##
+
+# the data of Appendix-NLLS-Python: population sizes over time, with 10%
+# noise (np.random.seed(1234)), to be fitted on a log scale
+T_DATA = np.arange(0, 24, 2)
+N_DATA = np.array([32500, 33000, 38000, 105000, 445000, 1430000, 3020000,
+                   4720000, 5670000, 5870000, 5930000, 5940000], dtype=np.float64)
+N_RAND = N_DATA * (1 + np.random.RandomState(1234).normal(scale=0.1, size=len(N_DATA)))
+
+CRITERIA = ('aic', 'bic', 'rss')
+
+## the models of the notebook, as residuals: model(t) - data ##
+
+def residuals_linear(params, t, data):
+    """Calculate cubic growth and subtract data"""
+    v = params.valuesdict()
+    model = v['a'] * t ** 3 + v['b'] * t ** 2 + v['c'] * t + v['d']
+    return model - data
+
+def residuals_logistic(params, t, data):
+    """Model a logistic growth (logged) and subtract data"""
+    v = params.valuesdict()
+    model = np.log(v['N_0'] * v['N_max'] * np.exp(v['r'] * t) /
+                   (v['N_max'] + v['N_0'] * (np.exp(v['r'] * t) - 1)))
+    return model - data
+
+def residuals_gompertz(params, t, data):
+    """Model a Gompertz growth (logged) and subtract data"""
+    v = params.valuesdict()
+    model = v['N_0'] + (v['N_max'] - v['N_0']) * \
+        np.exp(-np.exp(v['r_max'] * np.exp(1) * (v['t_lag'] - t) /
+                       ((v['N_max'] - v['N_0']) * np.log(10)) + 1))
+    return model - data
+
+def residuals_genlogistic(params, t, data):
+    """Model a generalised logistic growth (logged) and subtract data"""
+    v = params.valuesdict()
+    model = v['A'] + (v['K'] - v['A']) / \
+        (1 + v['Q'] * np.exp(-v['B'] * (t - v['T']))) ** (1 / v['mu'])
+    return model - data
+
+## random starting values, from ranges set by the (logged) data ##
+
+def _linear_start(rng, t, y):
+    params = Parameters()
+    for name in 'abc':
+        params.add(name, value=rng.uniform(-1, 1))
+    params.add('d', value=rng.uniform(y.min(), y.max()))
+    return params
+
+def _logistic_start(rng, t, y):
+    params = Parameters()
+    params.add('N_0', value=np.exp(y[0] + rng.uniform(-1, 1)), min=0)
+    params.add('N_max', value=np.exp(y.max() + rng.uniform(-1, 1)), min=0)
+    params.add('r', value=rng.uniform(0.01, 2))
+    return params
+
+def _gompertz_start(rng, t, y):
+    params = Parameters()
+    params.add('N_0', value=y[0] + rng.uniform(-1, 1), min=0)
+    params.add('N_max', value=y.max() + rng.uniform(-1, 1), min=0)
+    params.add('r_max', value=rng.uniform(0.01, 2))
+    params.add('t_lag', value=rng.uniform(0, t.max()), min=0)
+    return params
+
+def _genlogistic_start(rng, t, y):
+    params = Parameters()
+    params.add('A', value=y.min() * rng.uniform(0.5, 1.5), min=0)
+    params.add('K', value=y.max() * rng.uniform(0.5, 1.5), min=0)
+    params.add('Q', value=rng.uniform(0.01, 2), min=0)
+    params.add('B', value=rng.uniform(0.01, 2), min=0)
+    params.add('mu', value=rng.uniform(0.01, 2), min=0)
+    params.add('T', value=rng.uniform(0, t.max()), min=0)
+    return params
+
+# model: (residuals, random starting Parameters(rng, t, y))
+MODELS = {'linear': (residuals_linear, _linear_start),
+          'logistic': (residuals_logistic, _logistic_start),
+          'gompertz': (residuals_gompertz, _gompertz_start),
+          'genlogistic': (residuals_genlogistic, _genlogistic_start)}
+
+## functions ##
+
+def _columns(models):
+    """The parameter names of the models, in order, each once"""
+    names = []
+    for model in models:
+        for name in MODELS[model][1](np.random.default_rng(0), T_DATA, np.log(N_RAND)):
+            if name not in names:
+                names.append(name)
+    return names
+
+def _fit_start(task, t, y, method, columns, rng=None):
+    """Fit one model from one random start, in a worker process: a row of
+    the result table"""
+    model, start = task
+    residuals, starting = MODELS[model]
+    row = {'model': model, 'start': start, 'success': False, 'message': '',
+           'rss': np.nan, 'aic': np.nan, 'bic': np.nan, 'nfev': 0}
+    row.update((name, np.nan) for name in columns)
+    try:
+        params = starting(rng, t, y)
+        with warnings.catch_warnings(), np.errstate(all='ignore'):
+            warnings.simplefilter('ignore') # overflows from wild starts
+            result = Minimizer(residuals, params, fcn_args=(t, y)).minimize(method=method)
+    except Exception as error: # e.g. nan residuals: a failed start
+        row['message'] = '%s: %s' % (type(error).__name__, error)
+        return row
+    rss = float(np.sum(result.residual ** 2))
+    row.update(success=bool(result.success and np.isfinite(rss)),
+               message=str(result.message), rss=rss, aic=float(result.aic),
+               bic=float(result.bic), nfev=int(result.nfev))
+    row.update((name, float(p.value)) for name, p in result.params.items())
+    return row
+
+def fit_models(t, y, models=tuple(MODELS), starts=50, seed=None, processes=None,
+               method='leastsq'):
+    """Fit each of the models (names in MODELS) to data y (logged
+    population sizes) at times t, from `starts` random starting values each,
+    across `processes` worker processes (all the cores by default). Returns
+    the result table: a list of rows (dicts), one per fit, in the order of
+    models and starts.
+
+    >>> rows = fit_models(T_DATA, np.log(N_RAND), ['logistic'], starts=4, seed=1, processes=1)
+    >>> len(rows), sorted(rows[0])[:5]
+    (4, ['N_0', 'N_max', 'aic', 'bic', 'message'])
+    >>> best = best_fits(rows)[0]
+    >>> best['model'], round(best['r'], 2)
+    ('logistic', 0.45)
+    """
+    unknown = [m for m in models if m not in MODELS]
+    if unknown:
+        raise ValueError("unknown models %s (use %s)" % (unknown, ', '.join(MODELS)))
+    t = np.asarray(t, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    tasks = [(model, start) for model in models for start in range(starts)]
+    return parallel_map(_fit_start, tasks, processes=processes, seed=seed, t=t,
+                        y=y, method=method, columns=_columns(models))
+
+def best_fits(rows, by='aic'):
+    """The best successful fit of each model (by AIC, BIC or RSS), with the
+    number of starts that failed ('failures'), best model first. A model
+    none of whose starts succeeded is kept, last, as its first start with
+    nan criteria (and failures equal to its number of starts).
+
+    >>> rows = [{'model': 'a', 'success': True, 'rss': 1., 'aic': 2., 'bic': 3.},
+    ...         {'model': 'b', 'success': False, 'rss': 5., 'aic': 1., 'bic': 1.}]
+    >>> [(row['model'], row['aic'], row['failures']) for row in best_fits(rows)]
+    [('a', 2.0, 0), ('b', nan, 1)]
+    """
+    if by not in CRITERIA:
+        raise ValueError("by must be one of %s, not %r" % (CRITERIA, by))
+    best = {}
+    failures = {}
+    for row in rows:
+        model = row['model']
+        failures[model] = failures.get(model, 0) + (not row['success'])
+        if model not in best:
+            best[model] = row if row['success'] else dict(row, **dict.fromkeys(CRITERIA, np.nan))
+        elif row['success'] and (not best[model]['success'] or row[by] < best[model][by]):
+            best[model] = row
+    return sorted((dict(row, failures=failures[model]) for model, row in best.items()),
+                  key=lambda row: (not row['success'], row[by]))
+
+def write_rows(rows, filename):
+    """Write the result table (rows with the same keys) to a csv file"""
+    with open(filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main(argv):
+    """ Main entry point of the program """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('starts', type=int, nargs='?', default=100,
+                        help='random starts per model (default: %(default)s)')
+    parser.add_argument('processes', type=int, nargs='?', default=None,
+                        help='worker processes (default: all the cores)')
+    parser.add_argument('-s', '--seed', type=int, default=1, help='random seed')
+    parser.add_argument('-o', '--output', default='../results/nlls_fits.csv',
+                        help='csv file for the table of all the fits (default: %(default)s)')
+    args = parser.parse_args(argv[1:])
+
+    y = np.log(N_RAND)
+    start = time.time()
+    rows = fit_models(T_DATA, y, starts=args.starts, seed=args.seed,
+                      processes=args.processes)
+    print("%d fits (%d starts x %d models) in %.2f s" %
+          (len(rows), args.starts, len(MODELS), time.time() - start))
+    print("%-12s %10s %10s %10s %9s" % ('model', 'AIC', 'BIC', 'RSS', 'failures'))
+    for row in best_fits(rows):
+        print("%-12s %10.2f %10.2f %10.4f %5d/%d" % (row['model'], row['aic'], row['bic'],
+                                                     row['rss'], row['failures'], args.starts))
+    write_rows(rows, args.output)
+    print("Table of all %d fits written to %s" % (len(rows), args.output))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
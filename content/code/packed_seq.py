@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+"""Bit-packed DNA sequences, and ungapped alignment scoring on packed words.
+
+A PackedSeq stores each base in 2 bits (A=0, C=1, G=2, T/U=3), 32 bases to
+a uint64 word, i.e. a quarter of the memory of one byte per base. Bases that
+are not A, C, G or T (N and the other IUPAC ambiguity codes) are flagged in a
+mask, which is only stored when a sequence has any, and never count as
+matches.
+
+Two aligned words are compared all at once: XOR-ing them leaves a nonzero
+2-bit lane wherever the bases differ, and counting the set bits (popcount)
+of the lanes that are left at zero gives the number of matches among those
+32 bases. score_profile_packed does this for every offset of one sequence
+along the other, and is available as method='packed' in align_seqs_vect.
+
+Usage: python3 packed_seq.py [seq1.fasta seq2.fasta]"""
+
+__appname__ = 'packed_seq'
+__version__ = '0.0.1'
+
+import sys
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+## constants ##
+
+BASES = 'ACGT'
+BASES_PER_WORD = 32
+LOW_BITS = np.uint64(0x5555555555555555) # the low bit of every 2-bit lane
+CHUNK_WORDS = 2 ** 20 # max words compared at once when scoring
+
+# ASCII code -> 2-bit base code, 255 for anything ambiguous
+CODES = np.full(256, 255, dtype=np.uint8)
+for _i, _b in enumerate(BASES):
+    CODES[ord(_b)] = CODES[ord(_b.lower())] = _i
+CODES[ord('U')] = CODES[ord('u')] = 3
+
+_SHIFTS = 2 * np.arange(BASES_PER_WORD, dtype=np.uint64)
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+## functions ##
+
+def popcount(words):
+    """Number of set bits in each uint64 word
+
+    >>> popcount(np.array([0, 1, 2 ** 64 - 1], dtype=np.uint64))
+    array([ 0,  1, 64])
+    """
+    if hasattr(np, 'bitwise_count'): # numpy >= 2.0
+        return np.bitwise_count(words).astype(np.int64)
+    counts = _POPCOUNT8[words.view(np.uint8)].reshape(words.shape + (8,))
+    return counts.sum(axis=-1, dtype=np.int64)
+
+def pack_codes(codes, ambiguous):
+    """Pack an array of 2-bit base codes into uint64 words, and the ambiguous
+    flags into the low bits of the matching 2-bit lanes of a mask (or None
+    if nothing is ambiguous). Unused lanes of the last word are left at 0."""
+    n = len(codes)
+    nwords = -(-n // BASES_PER_WORD) # ceiling division
+    def pack(values):
+        lanes = np.zeros(nwords * BASES_PER_WORD, dtype=np.uint64)
+        lanes[:n] = values
+        lanes = lanes.reshape(nwords, BASES_PER_WORD) << _SHIFTS
+        return np.bitwise_or.reduce(lanes, axis=1)
+    words = pack(np.where(ambiguous, 0, codes))
+    if not ambiguous.any():
+        return words, None
+    return words, pack(ambiguous)
+
+class PackedSeq:
+    """A DNA sequence stored at 2 bits per base, with an ambiguity mask,
+    built from a string or a uint8 array of its ASCII codes
+
+    >>> s = PackedSeq("ACGTNacgu")
+    >>> len(s), str(s)
+    (9, 'ACGTNACGT')
+    >>> s.words.nbytes, s.mask.nbytes
+    (8, 8)
+    """
+
+    def __init__(self, seq):
+        if isinstance(seq, str):
+            raw = np.frombuffer(seq.encode('ascii'), dtype=np.uint8)
+        else: # an array of ASCII codes, as from align_seqs_vect.encode
+            raw = np.asarray(seq, dtype=np.uint8)
+        codes = CODES[raw]
+        self.length = len(codes)
+        self.words, self.mask = pack_codes(codes, codes == 255)
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return "PackedSeq(%r)" % str(self)
+
+    def __str__(self):
+        letters = np.frombuffer(BASES.encode('ascii'), dtype=np.uint8)[self.codes()]
+        letters[self.ambiguous()] = ord('N')
+        return letters.tobytes().decode('ascii')
+
+    @property
+    def nbytes(self):
+        """Memory used by the packed bases (and the mask, if any)"""
+        return self.words.nbytes + (0 if self.mask is None else self.mask.nbytes)
+
+    def codes(self):
+        """The 2-bit code (0-3) of every base, as a uint8 array"""
+        lanes = (self.words[:, None] >> _SHIFTS) & np.uint64(3)
+        return lanes.ravel()[:self.length].astype(np.uint8)
+
+    def ambiguous(self):
+        """Which bases are ambiguous (not A, C, G or T), as a boolean array"""
+        if self.mask is None:
+            return np.zeros(self.length, dtype=bool)
+        lanes = (self.mask[:, None] >> _SHIFTS) & np.uint64(1)
+        return lanes.ravel()[:self.length].astype(bool)
+
+def _shifted_words(words, r):
+    """The words that start r bases into each word of a packed array"""
+    if r == 0:
+        return words[:-1]
+    return (words[:-1] >> np.uint64(2 * r)) | (words[1:] << np.uint64(64 - 2 * r))
+
+def score_profile_packed(s1, s2, overlap='right'):
+    """Number of matching (unambiguous) bases at each offset of s2 along s1,
+    with the offsets of align_seqs_vect.profile_offsets. s1 and s2 are
+    PackedSeqs, strings or uint8 arrays of ASCII codes.
+
+    >>> score_profile_packed("CAATTCGGAT", "ATCG")
+    array([0, 1, 2, 3, 1, 0, 0, 0, 2, 0])
+    >>> score_profile_packed("CAATTCGGAT", "ATCG", overlap='full')
+    array([0, 1, 0, 0, 1, 2, 3, 1, 0, 0, 0, 2, 0])
+    >>> score_profile_packed("ACGTN", "ACGTN")
+    array([4, 0, 0, 0, 0])
+    >>> score_profile_packed(np.frombuffer(b"CAATTCGGAT", dtype=np.uint8), "ATCG")
+    array([0, 1, 2, 3, 1, 0, 0, 0, 2, 0])
+    """
+    if not isinstance(s1, PackedSeq):
+        s1 = PackedSeq(s1)
+    if not isinstance(s2, PackedSeq):
+        s2 = PackedSeq(s2)
+    l1, l2 = len(s1), len(s2)
+    if overlap not in ('right', 'full'):
+        raise ValueError("unknown overlap %r" % overlap)
+    left = l2 - 1 if overlap == 'full' else 0
+    noffsets = left + l1
+
+    # repack s1 with masked padding: `left` bases before it, and enough after
+    # it for a window of s2's words to start at any offset
+    w2 = len(s2.words)
+    right = (w2 + 1) * BASES_PER_WORD
+    codes = np.zeros(left + l1 + right, dtype=np.uint8)
+    codes[left:left + l1] = s1.codes()
+    ambiguous = np.ones(len(codes), dtype=bool)
+    ambiguous[left:left + l1] = s1.ambiguous()
+    words1, mask1 = pack_codes(codes, ambiguous)
+
+    # the lanes of s2 that can match: not ambiguous, and not past its end
+    valid2 = np.full(w2, LOW_BITS)
+    if l2 % BASES_PER_WORD:
+        valid2[-1] >>= np.uint64(2 * (BASES_PER_WORD - l2 % BASES_PER_WORD))
+    if s2.mask is not None:
+        valid2 &= ~s2.mask
+    scores = np.empty(noffsets, dtype=np.int64)
+    step = max(1, CHUNK_WORDS // max(w2, 1))
+    for r in range(BASES_PER_WORD): # offsets r, r + 32, r + 64, ...
+        nq = len(range(r, noffsets, BASES_PER_WORD))
+        if nq == 0:
+            break
+        windows = sliding_window_view(_shifted_words(words1, r), w2)[:nq]
+        masks = sliding_window_view(_shifted_words(mask1, r), w2)[:nq]
+        for q in range(0, nq, step):
+            diff = windows[q:q + step] ^ s2.words
+            same = ~(diff | (diff >> np.uint64(1))) & valid2 & ~masks[q:q + step]
+            counts = popcount(same).sum(axis=1)
+            scores[r + BASES_PER_WORD * q:noffsets:BASES_PER_WORD][:len(counts)] = counts
+    return scores
+
+def main(argv):
+    """ Main entry point of the program """
+    from fasta import read_fasta
+    from align_seqs_vect import encode
+    if len(argv) == 3:
+        seq1 = next(read_fasta(argv[1]))[1] # the first record of each file
+        seq2 = next(read_fasta(argv[2]))[1]
+    else:
+        seq1 = "ATCGCCGGATTACGGG"
+        seq2 = "CAATTCGGAT"
+    for seq in (seq1, seq2):
+        print("%d bp: %d bytes as uint8, %d bytes packed" %
+              (len(seq), encode(seq).nbytes, PackedSeq(seq).nbytes))
+    scores = score_profile_packed(seq1, seq2, overlap='full')
+    print("Best score:", scores.max())
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -1,29 +1,272 @@
-import pprocess
-import scipy.stats as st
+#!/usr/bin/env python3
+
+"""A parallel map over a pool of worker processes, and a speedup report.
+
+parallel_map(func, args) calls func on every argument in a pool of worker
+processes (concurrent.futures.ProcessPoolExecutor, from the standard
+library), sending the arguments to the workers in chunks to cut down on
+inter-process communication. If a seed is given, every task gets its own
+independent random number generator (rng=...) spawned from it with
+numpy.random.SeedSequence, so that the results are reproducible and don't
+depend on the number of processes. Results come back in the order of the
+arguments, or as (index, result) pairs as soon as they are done.
+
+speedup_report times the same map in series and on increasing numbers of
+processes, to see how well a task actually scales.
+
+pointless_function draws all its random numbers at once just to average
+them; streaming_pointless_function draws them in fixed-size chunks and keeps
+running moments (RunningMoments: count, mean and sum of squared deviations,
+updated chunk by chunk as in Welford's algorithm), so its memory use doesn't
+grow with the sample size. Running moments from different workers combine
+exactly, which parallel_moments uses to split one big sample across
+processes.
+
+Usage: python3 parallel.py [size] [processes]"""
+
+__appname__ = 'parallel'
+__version__ = '0.0.1'
+
+import concurrent.futures
+import functools
+import os
+import sys
 import time
+import tracemalloc
+
 import numpy
+import scipy.stats as st
 
-def pointless_function(x):
-    rv = st.norm.rvs(loc=x, scale=1, size=2e8)
+## constants ##
+
+CHUNK_SIZE = 2 ** 18 # random draws per chunk in the streaming versions (2 MB)
+
+## functions ##
+
+def pointless_function(x, size=10 ** 7, rng=None):
+    """Mean of size normal random draws with mean x (size=10^7 takes 80 MB)"""
+    rv = st.norm.rvs(loc=x, scale=1, size=int(size), random_state=rng)
     m = numpy.mean(rv)
     return m
 
-if __name__ == "__main__":
+class RunningMoments:
+    """Count, mean and variance of a stream of numbers, updated a chunk at a
+    time in constant memory, and combinable with the moments of another
+    stream (Chan et al.'s pairwise form of Welford's algorithm)
+
+    >>> m = RunningMoments()
+    >>> m.update(numpy.array([1.0, 2.0])); m.update(numpy.array([3.0, 4.0, 5.0]))
+    >>> m.n, m.mean, m.variance
+    (5, 3.0, 2.5)
+    >>> (RunningMoments([1.0, 2.0]) + RunningMoments([3.0, 4.0, 5.0])).variance
+    2.5
+    """
+
+    def __init__(self, values=None):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # sum of squared deviations from the mean
+        if values is not None:
+            self.update(numpy.asarray(values, dtype=numpy.float64))
+
+    def __repr__(self):
+        return "RunningMoments(n=%d, mean=%r, variance=%r)" % (self.n, self.mean, self.variance)
+
+    def _merge(self, n, mean, m2):
+        total = self.n + n
+        if total == 0:
+            return
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def update(self, chunk):
+        """Add a chunk (array) of values"""
+        if len(chunk):
+            mean = float(chunk.mean())
+            self._merge(len(chunk), mean, float(((chunk - mean) ** 2).sum()))
+
+    def combine(self, other):
+        """Add the values summarised by another RunningMoments"""
+        self._merge(other.n, other.mean, other.m2)
+        return self
+
+    def __add__(self, other):
+        return RunningMoments().combine(self).combine(other)
+
+    @property
+    def variance(self):
+        """Sample variance (with n - 1 degrees of freedom)"""
+        return self.m2 / (self.n - 1) if self.n > 1 else float('nan')
+
+    @property
+    def std(self):
+        """Sample standard deviation"""
+        return self.variance ** 0.5
+
+def normal_moments(x, size, rng=None, chunk=CHUNK_SIZE):
+    """RunningMoments of size normal random draws with mean x, drawn chunk
+    at a time, so in memory proportional to chunk, not size"""
+    rng = numpy.random.default_rng(rng)
+    moments = RunningMoments()
+    size = int(size)
+    for start in range(0, size, chunk):
+        moments.update(rng.normal(x, 1, min(chunk, size - start)))
+    return moments
+
+def streaming_pointless_function(x, size=10 ** 7, rng=None, chunk=CHUNK_SIZE):
+    """pointless_function, in constant memory"""
+    return normal_moments(x, size, rng, chunk).mean
+
+def parallel_moments(x, size, processes=None, seed=None, chunk=CHUNK_SIZE):
+    """RunningMoments of size normal draws with mean x, split into one part
+    per process, each drawn from its own random stream and then combined
+
+    >>> m = parallel_moments(5, 10 ** 5, processes=1, seed=0)
+    >>> m.n, round(m.mean, 1), round(m.variance, 1)
+    (100000, 5.0, 1.0)
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    sizes = [size // processes + (i < size % processes) for i in range(processes)]
+    parts = parallel_map(functools.partial(_part_moments, x, chunk=chunk), sizes,
+                         processes=processes, chunksize=1, seed=seed)
+    return functools.reduce(RunningMoments.combine, parts, RunningMoments())
+
+def _part_moments(x, size, rng=None, chunk=CHUNK_SIZE):
+    """normal_moments with the size as the mapped argument"""
+    return normal_moments(x, size, rng, chunk)
+
+def compare_reductions(size, x=1.0, seed=1):
+    """Time and peak memory (traced numpy allocations) of the materialising
+    pointless_function against streaming_pointless_function, printed and
+    returned as a dict of name: (seconds, peak bytes)"""
+    results = {}
+    for name, func in (('materialising', pointless_function),
+                       ('streaming', streaming_pointless_function)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        func(x, size=size, rng=numpy.random.default_rng(seed))
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = (seconds, peak)
+        print("%-14s %9.3f s %10.1f MB peak" % (name, seconds, peak / 2 ** 20))
+    return results
+
+def _run_chunk(func, chunk, kwargs):
+    """Run func on a chunk of (index, argument, SeedSequence or None)
+    tasks, in a worker process"""
+    out = []
+    for i, arg, seed in chunk:
+        if seed is None:
+            out.append((i, func(arg, **kwargs)))
+        else:
+            out.append((i, func(arg, rng=numpy.random.default_rng(seed), **kwargs)))
+    return out
+
+def _submit_chunks(func, args, processes, chunksize, seed, kwargs):
+    """Split the tasks into chunks and run them, yielding lists of (index,
+    result) as they are done"""
+    args = list(args)
+    n = len(args)
+    seeds = numpy.random.SeedSequence(seed).spawn(n) if seed is not None else [None] * n
+    tasks = list(zip(range(n), args, seeds))
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, -(-n // (4 * processes))) # ~4 chunks per process
+    chunks = [tasks[i:i + chunksize] for i in range(0, n, chunksize)]
+    if processes == 1:
+        for chunk in chunks:
+            yield _run_chunk(func, chunk, kwargs)
+        return
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        futures = [executor.submit(_run_chunk, func, chunk, kwargs) for chunk in chunks]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+def parallel_map(func, args, processes=None, chunksize=None, ordered=True,
+                 seed=None, **kwargs):
+    """Call func(arg, **kwargs) on every arg in a pool of `processes`
+    worker processes (all the cores by default; 1 runs everything in this
+    process), `chunksize` arguments at a time (default: about 4 chunks per
+    process). If seed is given, func is also passed its own random
+    Generator as rng=..., spawned from seed. Returns the list of results in
+    the order of args if ordered, or else an iterator of (index, result)
+    pairs in the order they are done. func must be picklable (defined at
+    the top level of a module).
+
+    >>> [round(float(m), 2) for m in parallel_map(pointless_function, [1, 3, 10],
+    ...                                           processes=1, seed=0, size=10000)]
+    [1.0, 2.98, 9.99]
+    """
+    results = _submit_chunks(func, args, processes, chunksize, seed, kwargs)
+    if not ordered:
+        return (pair for chunk in results for pair in chunk)
+    out = {}
+    for chunk in results:
+        out.update(chunk)
+    return [out[i] for i in range(len(out))]
+
+def speedup_report(func, args, processes=None, repeat=1, seed=None, **kwargs):
+    """Time parallel_map(func, args) in this process and on each number of
+    processes in `processes` (default: 2, 4, ... up to the number of cores),
+    print a table of times, speedups and parallel efficiencies, and return
+    it as a list of (processes, seconds, speedup) tuples. Times are the best
+    of `repeat` runs."""
+    if processes is None:
+        ncores = os.cpu_count() or 1
+        processes = [2 ** k for k in range(1, ncores.bit_length()) if 2 ** k < ncores] + [ncores]
+        processes = [p for p in processes if p > 1]
+    rows = []
+    serial = None
+    for p in [1] + list(processes):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parallel_map(func, args, processes=p, seed=seed, **kwargs)
+            best = min(best, time.perf_counter() - start)
+        if serial is None:
+            serial = best
+        rows.append((p, best, serial / best))
+    print("%10s %10s %9s %11s" % ('processes', 'seconds', 'speedup', 'efficiency'))
+    for p, seconds, speedup in rows:
+        print("%10d %10.3f %8.2fx %10.0f%%" % (p, seconds, speedup, 100 * speedup / p))
+    return rows
+
+def main(argv):
+    """ Main entry point of the program """
+    size = int(float(argv[1])) if len(argv) > 1 else 10 ** 7
+    processes = [int(argv[2])] if len(argv) > 2 else None
     list_of_args = [1, 3, 10]
 
     # Serial computation:
     start = time.time()
-    serial = map(pointless_function, list_of_args)
-    # Print results.
+    serial = parallel_map(pointless_function, list_of_args, processes=1,
+                          seed=1, size=size)
     for i in serial:
-        print i
-    print "%f s for serial computation." % (time.time() - start)
+        print(i)
+    print("%f s for serial computation." % (time.time() - start))
 
-    # Parallel computation:
+    # Parallel computation (same seeds, so the same results):
     start = time.time()
-    nproc = 3  # maximum number of simultaneous processes desired
-    parallel = pprocess.pmap(pointless_function, list_of_args, limit=nproc)
-    # Print results.
+    parallel = parallel_map(pointless_function, list_of_args, seed=1, size=size)
     for i in parallel:
-        print i
-    print "%f s for parallel computation." % (time.time() - start)
+        print(i)
+    print("%f s for parallel computation." % (time.time() - start))
+
+    print("\nSpeedup on %d cores, 12 tasks:" % (os.cpu_count() or 1))
+    speedup_report(pointless_function, list(range(12)), processes, seed=1, size=size)
+
+    print("\nMean of %d draws, all at once vs. in chunks of %d:" % (size, CHUNK_SIZE))
+    compare_reductions(size)
+    start = time.time()
+    moments = parallel_moments(1, size, seed=1)
+    print("Combined across processes: %r (%.3f s)" % (moments, time.time() - start))
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+
+"""An illustrative program to profile (run it with `run -p profileme.py`)"""
+
+def my_squares(iters):
+    out = []
+    for i in range(iters):
+        out.append(i ** 2)
+    return out
+
+def my_join(iters, string):
+    out = ''
+    for i in range(iters):
+        out += string.join(", ")
+    return out
+
+def run_my_funcs(x,y):
+    print(x,y)
+    my_squares(x)
+    my_join(x,y)
+    return 0
+
+if __name__ == "__main__":
+    run_my_funcs(10000000,"My string")
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+
+"""profileme.py, sped up with a list comprehension and explicit string
+concatenation (run it with `run -p profileme2.py`)"""
+
+def my_squares(iters):
+    out = [i ** 2 for i in range(iters)]
+    return out
+
+def my_join(iters, string):
+    out = ''
+    for i in range(iters):
+        out += ", " + string
+    return out
+
+def run_my_funcs(x,y):
+    print(x,y)
+    my_squares(x)
+    my_join(x,y)
+    return 0
+
+if __name__ == "__main__":
+    run_my_funcs(10000000,"My string")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+
+"""Share numpy arrays with worker processes without copying them.
+
+Arguments of a task sent to a multiprocessing pool are pickled, i.e. copied
+into a byte string, sent down a pipe, and copied again into a new array on
+the other side, for every task. For big arrays that's slow, and each worker
+ends up with its own copy. Instead, SharedArrays copies each array once into
+a block of shared memory (multiprocessing.shared_memory), and the workers of
+its pool attach numpy views of those blocks (get(name)): tasks then only
+need to carry small arguments, like the slice of the arrays to work on, and
+can write their results straight into a shared output array too.
+
+The blocks are freed (unlinked) when the SharedArrays is closed or its
+`with` block is left, whether normally or by an exception, when it is
+garbage collected, or at interpreter exit; each one is unmapped once the
+last array view of it is gone. If the main process is killed outright,
+multiprocessing's resource tracker unlinks them instead.
+
+Usage: python3 shared_arrays.py [processes]"""
+
+__appname__ = 'shared_arrays'
+__version__ = '0.0.1'
+
+import multiprocessing
+import os
+import sys
+import time
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from vectorize import vect_product
+
+## functions ##
+
+_attached = {} # name: (SharedMemory, array view), in each worker process
+
+def _close_when_unused(block, view_ref):
+    """Unmap a shared memory block now, or when the (weakly referenced)
+    array view of it is garbage collected if it's still in use: unmapping
+    memory that an array still points at would crash the process"""
+    view = view_ref()
+    if view is None:
+        block.close()
+    else:
+        weakref.finalize(view, block.close)
+
+def _free(blocks):
+    """Unlink a list of (shared memory block, weakref to its view), and
+    unmap them as soon as they are unused (a finalizer too, so it mustn't
+    refer to the SharedArrays itself)"""
+    for block, view_ref in blocks:
+        try:
+            block.unlink()
+        except FileNotFoundError: # already unlinked
+            pass
+        _close_when_unused(block, view_ref)
+    blocks.clear()
+
+def _open(block_name):
+    """Attach an existing shared memory block by name"""
+    if sys.version_info >= (3, 13): # the creator tracks (and frees) it
+        return shared_memory.SharedMemory(block_name, track=False)
+    return shared_memory.SharedMemory(block_name)
+
+def attach(specs):
+    """Attach the arrays described by specs (SharedArrays.specs) in this
+    process, to be looked up with get(name). Used as the initializer of
+    worker processes."""
+    for name, (block_name, shape, dtype) in specs.items():
+        if name in _attached and _attached[name][0].name == block_name:
+            continue
+        block = _open(block_name)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        _attached[name] = (block, array)
+
+def get(name):
+    """The shared array published under name, as a numpy view (no copy)"""
+    try:
+        return _attached[name][1]
+    except KeyError:
+        raise KeyError("no shared array %r attached in this process "
+                       "(is it a worker of SharedArrays.pool()?)" % name) from None
+
+class SharedArrays:
+    """Numpy arrays published in shared memory, and pools of workers that
+    can see them
+
+    >>> with SharedArrays() as shared:
+    ...     a = shared.publish('a', np.arange(5.0))
+    ...     attach(shared.specs)
+    ...     get('a')[0] = 10.0 # writes through to the shared block
+    ...     a.tolist()
+    [10.0, 1.0, 2.0, 3.0, 4.0]
+    """
+
+    def __init__(self):
+        self.specs = {} # name: (block name, shape, dtype), cheap to pickle
+        self._blocks = []
+        self._finalizer = weakref.finalize(self, _free, self._blocks)
+
+    def publish(self, name, array):
+        """Copy an array into a new shared memory block, under name, and
+        return a view of it"""
+        array = np.asarray(array)
+        view = self.empty(name, array.shape, array.dtype)
+        view[...] = array
+        return view
+
+    def empty(self, name, shape, dtype=np.float64):
+        """A new (uninitialised) shared array under name, e.g. for workers
+        to write their results into"""
+        dtype = np.dtype(dtype)
+        shape = tuple(np.atleast_1d(shape).tolist())
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        block = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        view = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        self._blocks.append((block, weakref.ref(view)))
+        self.specs[name] = (block.name, shape, dtype.str)
+        return view
+
+    def pool(self, processes=None):
+        """A multiprocessing.Pool whose workers have all the arrays
+        published so far attached"""
+        return multiprocessing.Pool(processes, attach, (dict(self.specs),))
+
+    def close(self):
+        """Free all the shared memory blocks: their names are removed at
+        once, and their memory once no array views of them are left"""
+        for name, (block_name, _, _) in self.specs.items():
+            if name in _attached and _attached[name][0].name == block_name:
+                block, view = _attached.pop(name)
+                _close_when_unused(block, weakref.ref(view))
+                del view
+        self.specs.clear()
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+## the benchmark: vectorize.vect_product, split across workers ##
+
+def _product_shared(bounds):
+    """c[lo:hi] = a[lo:hi] * b[lo:hi] on the shared arrays"""
+    lo, hi = bounds
+    get('c')[lo:hi] = vect_product(get('a')[lo:hi], get('b')[lo:hi])
+
+def _product_pickled(args):
+    """The product of two (pickled) slices, returned (pickled again)"""
+    a, b = args
+    return vect_product(a, b)
+
+def _bounds(N, ntasks):
+    edges = np.linspace(0, N, ntasks + 1).astype(int)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+def benchmark(sizes=(10000, 1000000, 10000000), processes=None, ntasks=None):
+    """Time vect_product on arrays of each size, split into ntasks slices
+    (default: 4 per process) across a pool, with the slices pickled to and
+    from the workers vs. shared memory. The pools are started before the
+    timing, so only the data passing and the work are timed. Prints and
+    returns a list of (size, pickle seconds, shared memory seconds)."""
+    processes = processes or os.cpu_count() or 1
+    ntasks = ntasks or 4 * processes
+    rng = np.random.default_rng(1)
+    rows = []
+    print("%10s %12s %12s %10s %10s" % ('N', 'pickle (s)', 'shared (s)', 'pickle MB/s', 'shared MB/s'))
+    for N in sizes:
+        a, b = rng.random(N), rng.random(N)
+        bounds = _bounds(N, ntasks)
+        with multiprocessing.Pool(processes) as pool:
+            pool.map(abs, range(processes)) # wait for the workers to start
+            start = time.perf_counter()
+            c1 = np.concatenate(pool.map(_product_pickled,
+                                         [(a[lo:hi], b[lo:hi]) for lo, hi in bounds]))
+            pickled = time.perf_counter() - start
+        with SharedArrays() as shared:
+            start = time.perf_counter()
+            shared.publish('a', a)
+            shared.publish('b', b)
+            c2 = shared.empty('c', N)
+            publish = time.perf_counter() - start
+            with shared.pool(processes) as pool:
+                pool.map(abs, range(processes))
+                start = time.perf_counter()
+                pool.map(_product_shared, bounds)
+                shm = time.perf_counter() - start + publish
+            assert np.array_equal(c1, c2)
+        mb = 3 * 8 * N / 2 ** 20 # a, b and c
+        print("%10d %12.4f %12.4f %10.0f %10.0f" % (N, pickled, shm, mb / pickled, mb / shm))
+        rows.append((N, pickled, shm))
+    return rows
+
+def main(argv):
+    """ Main entry point of the program """
+    processes = int(argv[1]) if len(argv) > 1 else None
+    # the array sizes of the vectorization example in 06-Python_II
+    benchmark([100, 10000, 1000000, 10000000], processes)
+    return 0
+
+if __name__ == "__main__":
+    status = main(sys.argv)
+    sys.exit(status)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+"""Compare the runtimes of a loop and a vectorized elementwise product"""
+
+import timeit
+import numpy as np
+
+def loop_product(a, b):
+    N = len(a)
+    c = np.zeros(N)
+    for i in range(N):
+        c[i] = a[i] * b[i]   
+    return c
+
+
+def vect_product(a, b):
+    return np.multiply(a, b)
+
+if __name__ == "__main__":
+    array_lengths = [1, 100, 10000, 1000000, 10000000]
+    t_loop = []
+    t_vect = []
+
+    for N in array_lengths:
+        print("\nSet N=%d" %N)
+        #randomly generate our 1D arrays of length N
+        a = np.random.rand(N)
+        b = np.random.rand(N)
+
+        # time loop_product 3 times and save the mean execution time.
+        timer = timeit.repeat('loop_product(a, b)', globals=globals().copy(), number=3)
+        t_loop.append(1000 * np.mean(timer))
+        print("Loop method took %d ms on average." %t_loop[-1])
+
+        # time vect_product 3 times and save the mean execution time.
+        timer = timeit.repeat('vect_product(a, b)', globals=globals().copy(), number=3)
+        t_vect.append(1000 * np.mean(timer))
+        print("vectorized method took %d ms on average." %t_vect[-1])